@@ -1,20 +1,38 @@
 import firebase_admin
 from firebase_admin import credentials, auth,firestore
-from flask import Flask, request, jsonify,make_response
+from flask import Flask, request, jsonify,make_response,send_file
 from flask_cors import CORS  # Import CORS
 from flask_cors import cross_origin
 
 import time
 from data_valid import UserSchema,add_project_schema,first_login_schema,list_of_mentors_schema,apply_mentors_schema,apply_mentors_status_takeback_schema
-from data_valid import accept_mentor_schema,apply_project_schema,apply_project_status_schema,list_apply_project_schema,list_projects_scheme
+from data_valid import accept_mentor_schema,apply_project_schema,apply_project_status_schema,list_projects_scheme
+from data_valid import search_projects_schema,notification_schema,notification_read_schema,chat_history_schema,start_upload_schema
+from data_valid import update_project_status_schema,admin_request_schema,admin_request_accept_schema,verify_member_schema,change_sprint_status_schema
+from data_valid import validate_json
 from datetime import datetime,timedelta
-from auth import  firebase_uid_required  # Import auth_bp
+from auth import  firebase_uid_required, session_cache, session_key  # Import auth_bp
 
 from smtp import send_email
 from sql import *
 from google.cloud.firestore_v1 import FieldFilter
 import os
 import json
+import click
+from migrations import migrate, check_query_plans
+from db import pool_status, db_connect, init_app as init_db
+import queries
+from leaderboard import refresher as leaderboard_refresher
+import attachments
+from id_tokens import verify_id_token
+from sessions import (save_session, session_valid, delete_session, SESSION_MAX_AGE,
+                      legacy_session_rejected, migrate_legacy_session)
+import session_tokens
+import jwt
+from concurrent.futures import ThreadPoolExecutor
+from json_provider import OrjsonProvider
+import http_cache
+from http_cache import project_conditional
 
 # Firebase is initialized in auth.py, just get the client here
 try:
@@ -27,6 +45,7 @@ except Exception as e:
     users = None
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Configure CORS for production - add all your production domains
 CORS(app, supports_credentials=True, origins=[
@@ -36,6 +55,58 @@ CORS(app, supports_credentials=True, origins=[
     "https://collabsphere.sanjaysahu.site"
 ])
 
+# Firestore session writes run here so a login does not wait on them
+firestore_writes = ThreadPoolExecutor(max_workers=int(os.getenv("FIRESTORE_WRITE_THREADS", 4)),
+                                      thread_name_prefix="firestore-write")
+
+def save_login(document_id, uid, fingerprint):
+    """Start the session for /auto_login, and record the login in Firestore in the background."""
+    save_session(uid, fingerprint)
+    def write():
+        db.collection('users').document(document_id).set({
+            "uid": uid,
+            "fingerprint": fingerprint,
+            "created_at": datetime.utcnow()  # Store exact timestamp from Python
+        })
+    def done(future):
+        if future.exception():
+            print(f"Firestore error: {future.exception()}")
+    firestore_writes.submit(write).add_done_callback(done)
+
+def set_session_token(response, uid, roll_no):
+    """Signed session cookie carrying uid, roll_no and role; see session_tokens.py."""
+    token = session_tokens.issue(uid, roll_no, user_role(roll_no))
+    response.set_cookie(
+        session_tokens.COOKIE_NAME, token,
+        httponly=True,  # Prevent JS access (security)
+        secure=True,  # Only allow over HTTPS
+        samesite="None",  # Restrict cross-site access
+        max_age=SESSION_MAX_AGE)
+
+def verified_email(decoded_token, claimed_email):
+    """Email of a verified ID token, or None if the token has none or the client claimed another."""
+    email = decoded_token.get("email")
+    if not email or (claimed_email and claimed_email.strip().lower() != email.lower()):
+        return None
+    return email
+
+def current_session():
+    """Claims of the request's session token, or None."""
+    token = request.cookies.get(session_tokens.COOKIE_NAME)
+    if not token:
+        return None
+    try:
+        return session_tokens.verify(token)
+    except jwt.InvalidTokenError:
+        return None
+
+# One pooled connection and one transaction per request, shared by every sql.py helper
+init_db(app)
+# 304s for ETags the client already has, and gzip/brotli for larger bodies
+http_cache.init_app(app)
+leaderboard_refresher.start()
+session_tokens.revocations.start()
+
 @app.route('/check',methods=['GET'])
 def check():
    return insert()
@@ -50,10 +121,17 @@ def verify_email():
 
             fingerprint = data.get("fingerprint")
 
-            decoded_token = auth.verify_id_token(id_token)  # Verify token
+            try:
+                decoded_token = verify_id_token(id_token)  # Verify token locally, keys are cached
+            except Exception as e:
+                return jsonify({"user_verfied": "false", "error": str(e)}), 401
        
             if decoded_token['uid'] != uid:
                return jsonify({"user_verfied": "false"}), 403
+            # roll_no (and so the role in the session token) comes from the token, not the body
+            user_email = verified_email(decoded_token, user_email)
+            if user_email is None:
+               return jsonify({"user_verfied": "false", "error": "Email does not match the ID token"}), 403
             #set in db
            # users.set({"first": "Ada", "last": "Lovelace", "born": 1815})
 
@@ -64,29 +142,18 @@ def verify_email():
             httponly=True,  # Prevent JS access (security)
             secure=True,  # Only allow over HTTPS
             samesite="None",  # Restrict cross-site access
-            max_age=60*60*24*3, ) # 3 days expiration
+            max_age=SESSION_MAX_AGE, ) # 3 days, same as the session
             
             response.set_cookie(
             "fingerprint", fingerprint, 
             httponly=True,  # Prevent JS access (security)
             secure=True,  # Only allow over HTTPS
             samesite="None",  # Restrict cross-site access
-            max_age=60*60*24*3, ) 
+            max_age=SESSION_MAX_AGE, ) 
 
-            try:
-              
-              users = db.collection('users').document(user_email)
-              users.set({
-    "uid": uid,
-    "fingerprint": fingerprint,
-    "created_at": datetime.utcnow()  # Store exact timestamp from Python
-})
-              print("Firestore write successful!")  # ✅ Debug message
-            except Exception as e:
-                 print(f"Firestore error: {e}")  # Log the error
-                 return jsonify({"success": False, "message": f"Firestore error: {e}"}), 500  # Return error response
             # put uid and fingerprint in firebase db
-            print(response.headers)
+            save_login(user_email, uid, fingerprint)
+            set_session_token(response, uid, user_email.split('@')[0])
             return response
 import re
 
@@ -108,18 +175,21 @@ def verify():
         return jsonify({"error": "Firebase not initialized. Check FIREBASE_CREDENTIALS environment variable."}), 500
     
     #new sign in
-    time.sleep(5)  # Add a 2-second delay before verifying
 
     data = request.json
     id_token = data.get("idToken")
     uid = data.get("uid")
     email=data.get("email")
-    roll_no= transform_email(email)
 
     fingerprint = data.get("fingerprint")
     #print(data)
     try:
-        decoded_token = auth.verify_id_token(id_token)  # Verify token
+        decoded_token = verify_id_token(id_token)  # Verify token locally; retries briefly on clock skew
+        # same as /verify/user_id: trust the token's email, not the body's
+        email = verified_email(decoded_token, email)
+        if email is None:
+              return jsonify({"user_verfied": "false", "error": "Email does not match the ID token"}), 403
+        data['email'] = email
         user_name = decoded_token.get('name')
         print(f"User name: {user_name}")
         user_name = user_name.replace("-IIITK", "").strip()
@@ -139,15 +209,8 @@ def verify():
         try:
          #   print(username)
          #not for prof
-            users = db.collection('users').document( email.split('@')[0] )
-        
-
-            
-            users.set({
-    "uid": uid,
-    "fingerprint": fingerprint,
-    "created_at": datetime.utcnow() })
-           # Add to Firestore
+            # Add to Firestore
+            save_login(email.split('@')[0], uid, fingerprint)
             print("success")
             print("ds")
             response = make_response(jsonify({"user_verified": True, "message": "cookie set","roll_no":data['roll_no']}))
@@ -158,7 +221,7 @@ def verify():
             
             secure=True,  # Only allow over HTTPS
             samesite="None",  # Restrict cross-site access
-            max_age=60*60*24*3,  # 7 days expiration
+            max_age=SESSION_MAX_AGE,  # 3 days, same as the session
             
             )
             response.set_cookie(
@@ -167,10 +230,11 @@ def verify():
             httponly=True,  # Prevent JS access (security)
             secure=True,  # Only allow over HTTPS
             samesite="None",  # Restrict cross-site access
-            max_age=60*60*24*3,  # 7 days expiration
+            max_age=SESSION_MAX_AGE,  # 3 days, same as the session
             
             )
             user_insert_google_sql(data)
+            set_session_token(response, uid, data['roll_no'])
 
            # print(response.headers)
             return response
@@ -184,6 +248,10 @@ def verify():
          return jsonify({"error": str(e)}), 401
 
 def get_roll_no(uid):
+    # the session token carries it; only older logins need the Firebase lookup
+    claims = current_session()
+    if claims and claims["uid"] == uid and claims.get("roll_no"):
+        return claims["roll_no"]
     user_id=auth.get_user(uid)
     
     email=user_id.email.split('@')[0]
@@ -205,14 +273,21 @@ def auto_login():
             fingerprint = request.args.get("fingerprint")
         
         # For now, if no fingerprint provided, just check if uid exists
+        # A valid session token needs no lookup at all
+        if current_session():
+            return jsonify({"authenticated": True})
+
         if not uid:
             return jsonify({"authenticated": False, "message": "Session expired"}), 401
-        
-        # Check if Firebase is initialized
-        if db is None or users is None:
-            print("ERROR: Firebase not initialized")
-            return jsonify({"authenticated": False, "message": "Server configuration error"}), 500
-        
+
+        # Point read on user_session (cached for a minute)
+        if session_valid(uid, fingerprint):
+            return jsonify({"authenticated": True})
+
+        # Logins from before user_session only exist in Firestore; move them over on first use
+        if db is None or users is None or legacy_session_rejected(uid, fingerprint):
+            return jsonify({"authenticated": False, "message": "Invalid session"}), 401
+
         # Query Firestore for user with this uid
         if fingerprint:
             # If fingerprint provided, match both uid and fingerprint
@@ -224,7 +299,8 @@ def auto_login():
         
         output = result.get()
         
-        if output and len(output) > 0:
+        # only if that login is still inside SESSION_MAX_AGE
+        if migrate_legacy_session(uid, fingerprint, [doc.to_dict().get("created_at") for doc in output]):
             return jsonify({"authenticated": True})
         else:
             return jsonify({"authenticated": False, "message": "Invalid session"}), 401
@@ -235,50 +311,53 @@ def auto_login():
 @app.route('/logout',methods=['GET'])
 def logout():
  try:
-    response = make_response(jsonify({"success": True, "message": "Logged out"}))
-    response.delete_cookie("uid")
-    response.delete_cookie("fingerprint")
-    return jsonify({"deleted":True}), 200
+    uid = request.cookies.get("uid")
+    if uid:
+        session_cache.invalidate(session_key(uid, request.cookies.get("fingerprint")))
+        delete_session(uid, request.cookies.get("fingerprint"))
+    claims = current_session()
+    if claims:
+        session_tokens.revocations.revoke(claims["jti"], claims["exp"])
+    response = make_response(jsonify({"deleted":True}), 200)
+    # same attributes as when they were set, or browsers keep the cookies
+    response.delete_cookie("uid", secure=True, httponly=True, samesite="None")
+    response.delete_cookie("fingerprint", secure=True, httponly=True, samesite="None")
+    response.delete_cookie(session_tokens.COOKIE_NAME, secure=True, httponly=True, samesite="None")
+    return response
  except Exception as e:
     return jsonify({"deleted":False}), 500
 
 @app.route('/add/project',methods=['POST'])
 @firebase_uid_required  # Apply the middleware here to protect the route
-
-def add_project():
-
-
-
-    data = request.json
-    errors=add_project_schema().validate(data)
-    if errors:
-        return jsonify({"error": errors}), 400
-    else:
-       return add_projects(data)
+@validate_json(add_project_schema)
+def add_project(data):
+    return add_projects(data)
     
 @app.route('/best_projects',methods=['GET'])
 
 def best_projects():
-      
-      return ranking()
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), 100)
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+
+    response = jsonify(ranking(limit, offset))
+    # The view only changes on refresh, so most landing-page loads end in a 304
+    response.add_etag()
+    response.cache_control.public = True
+    response.cache_control.max_age = 60
+    return response.make_conditional(request)
 
 @app.route('/first_login',methods=['POST'])
-def first_login():
-      
-      data=request.json
-      errors=first_login_schema().validate(data)
-      if errors:
-        return jsonify({"errors": errors}), 400
-      else:
-          return first_logins(data)
+@validate_json(first_login_schema)
+def first_login(data):
+    return first_logins(data)
+
 @app.route('/profile/view',methods=['POST'])
-def profile_view():
-        data=request.json
-        errors=first_login_schema().validate(data)
-        if errors:
-         return jsonify({"errors": errors}), 400
-        else:
-          return profile_views(data)
+@validate_json(first_login_schema)
+def profile_view(data):
+    return profile_views(data)
 
 @app.route('/update/profile',methods=['POST'])
 @firebase_uid_required  # Apply the middleware here to protect the route
@@ -294,134 +373,92 @@ def update_profile():
 
 
 @app.route('/list/mentors',methods=['POST'])
-def list_of_mentors():
-     data=request.json
-     errors=list_of_mentors_schema().validate(data)
-     if errors:
-      return jsonify({"errors": errors}), 400
-     else:
-      return list_of_mentors_sql(data)
+@validate_json(list_of_mentors_schema)
+def list_of_mentors(data):
+    return list_of_mentors_sql(data)
 
 @app.route('/apply/mentors',methods=['POST'])
-def apply_mentors():
-     
-     data=request.json
-     errors=apply_mentors_schema().validate(data)
-     if errors:
-       return jsonify({"errors": errors}), 400
-     else:
-       return apply_mentors_sql(data)
+@validate_json(apply_mentors_schema)
+def apply_mentors(data):
+    return apply_mentors_sql(data)
+
 @app.route('/apply/mentors/status/takeback',methods=['POST'])
-def apply_mentors_status_takeback():
-    data=request.json
-    errors=apply_mentors_status_takeback_schema().validate(data)
-    if errors:
-       return jsonify({"errors": errors}), 400
-    else:
-      return apply_mentors_takeback_sql(data)
+@validate_json(apply_mentors_status_takeback_schema)
+def apply_mentors_status_takeback(data):
+    return apply_mentors_takeback_sql(data)
+
 @app.route('/accept/mentors',methods=['POST'])
-def accept_mentor():
-     data=request.json
-     errors=accept_mentor_schema().validate(data)
-     if errors:
-       return jsonify({"errors": errors}), 400
-     else:
-         #required mentor_id(user_id),project_id
-       return accept_mentor_sql(data)
+@validate_json(accept_mentor_schema)
+def accept_mentor(data):
+    #required mentor_id(user_id),project_id
+    return accept_mentor_sql(data)
    
 @app.route('/list/projects',methods=['POST'])
  # Apply the middleware here to protect the route
+@validate_json(list_projects_scheme)
+def list_projects(data):
+    return list_projects_sql(data)
 
-def list_projects():
-    data=request.json
-    errors=list_projects_scheme().validate(data)
-    if errors:
-        return jsonify({"errors":errors}),400
-    
-    else:
-        return list_projects_sql(data)
-    
 @app.route('/list/current/projects',methods=['POST'])
-
-def list_current_projects():
-    data=request.json
-    errors=list_projects_scheme().validate(data)
-    if errors:
-        return  jsonify({"errors":errors}),400
-    else:
-        return list_current_projects_sql(data)
-    
+@validate_json(list_projects_scheme)
+def list_current_projects(data):
+    return list_current_projects_sql(data)
 
 @app.route('/list/past/projects',methods=['POST'])
-def list_past_projects():
-    data=request.json
-    errors=list_projects_scheme().validate(data)
-    if errors:
-        return  jsonify({"errors":errors}),400
-    else:
-        return list_past_projects_sql(data)
-    
-@app.route('/list/myprojects',methods=['POST'])
+@validate_json(list_projects_scheme)
+def list_past_projects(data):
+    return list_past_projects_sql(data)
 
+@app.route('/list/myprojects',methods=['POST'])
   # Apply the middleware here to protect the route
-def list_myprojects():
-    data=request.json
-    errors=list_projects_scheme().validate(data)
-    if errors:
-        return  jsonify({"errors":errors}),400
-    else:
-        return list_myprojects_sql(data)
+@validate_json(list_projects_scheme)
+def list_myprojects(data):
+    return list_myprojects_sql(data)
      
  
 
+@app.route('/search/projects',methods=['GET'])
+@validate_json(search_projects_schema, location="args")
+def search_projects(data):
+    if not data.get('q') and not data.get('tag'):
+        return jsonify({"errors":{"q":["Provide a search query or a tag."]}}),400
+    try:
+        return jsonify(search_projects_sql(data)),200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/apply/project',methods=['POST'])
  # Apply the middleware here to protect the route
 
-def apply_project():
-      data=request.json
-      errors=apply_project_schema().validate(data)
-      if errors:
-        return jsonify({"errors": errors}), 400
-      else:
-        return apply_project_sql(data)
+@validate_json(apply_project_schema)
+def apply_project(data):
+    return apply_project_sql(data)
+
 @app.route('/apply/project/status',methods=['POST'])
 @firebase_uid_required  # Apply the middleware here to protect the route
-
-def apply_project_status():
-    
-  data=request.json
-  errors=apply_project_status_schema().validate(data)
-  if errors:
-        return jsonify({"errors": errors}), 400
-  else:
-     return apply_project_status_sql(data)
+@validate_json(apply_project_status_schema)
+def apply_project_status(data):
+    return apply_project_status_sql(data)
 
 @app.route('/apply/project/status/takeback',methods=['POST'])
 @firebase_uid_required  # Apply the middleware here to protect the route
-
-def apply_project_status_takeback():
-    data=request.json
-    errors=apply_project_status_schema().validate(data)
-    if errors:
-        return jsonify({"errors": errors}), 400
-    else:
-        
-        return apply_project_status_takeback_sql(data)
+@validate_json(apply_project_status_schema)
+def apply_project_status_takeback(data):
+    return apply_project_status_takeback_sql(data)
 
 @app.route('/list/apply/status',methods=['POST'])
 @firebase_uid_required  # Apply the middleware here to protect the route
-
-def list_apply_project_():
-    data=request.json
-    errors=list_apply_project_schema().validate(data)
+@validate_json(apply_project_status_schema)
+def list_apply_project_(data):
     return list_apply_project_sql(data)
 
 @app.route('/update/project/app/status',methods=['POST'])
 #@firebase_uid_required  # Apply the middleware here to protect the route
-
-def list_update_project_status():
-    data=request.json
-   # errors=update_project_status_schema().validate(data)
+@validate_json(update_project_status_schema)
+def list_update_project_status(data):
     return update_project_application_status_sql(data)
 
 #delete project by admi
@@ -430,9 +467,9 @@ def list_update_project_status():
 #@firebase_uid_required  # Apply the middleware here to protect the route
 
 
-def admin_request():
+@validate_json(admin_request_schema)
+def admin_request(data):
  #check user_id is admin or not  later 
- data=request.json
 #check whether user is admin  then request
 
  return admin_request_sql(data)
@@ -443,9 +480,8 @@ def admin_request():
 #@firebase_uid_required  # Apply the middleware here to protect the route
 
 
-def admin_request_accept():
- data=request.json
-
+@validate_json(admin_request_accept_schema)
+def admin_request_accept(data):
  return admin_request_accept_sql(data)
 
 
@@ -464,22 +500,94 @@ def list_users():
      return list_users_sql()
 
 @app.route('/notification',methods=['POST'])
-#@firebase_uid_required  # Apply the middleware here to protect the route
+@firebase_uid_required  # Apply the middleware here to protect the route
+# /notification?since=<since from an earlier response> returns only what is new since that call
+@validate_json(notification_schema, location="both")
+def notification(data):
+ # the logged-in user's inbox; a user_id in the body is ignored
+ data["user_id"] = get_roll_no(request.user["uid"])
+ try:
+     return notification_sql(data)
+ except ValueError as e:
+     return jsonify({"error": str(e)}), 400
 
-def notification():
+@app.route('/notification/read',methods=['POST'])
+@firebase_uid_required  # Apply the middleware here to protect the route
+@validate_json(notification_read_schema)
+def notification_read(data):
+ if not data.get("ids") and not data.get("all"):
+     return jsonify({"error": "ids or all is required"}), 400
+ data["user_id"] = get_roll_no(request.user["uid"])
+ return mark_notifications_read_sql(data)
+
+@app.route('/chat/history',methods=['GET'])
+@firebase_uid_required
+@validate_json(chat_history_schema, location="args")
+def chat_history(data):
+    # project rooms are for project members only; the logged-in user, not ?user_id=
+    if data.get('project_id') and not is_valid_member(data['project_id'], get_roll_no(request.user["uid"])):
+        return jsonify({"error": "Not a member of this project"}), 403
+    try:
+        return jsonify(chat_history_sql(data)),200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
- data=request.json
- 
- return notification_sql(data)
+# Chat attachments: chunked, resumable uploads; chat messages only carry the attachment_id
+@app.route('/chat/attachments',methods=['POST'])
+@firebase_uid_required
+@validate_json(start_upload_schema)
+def start_attachment_upload(data):
+    try:
+        return jsonify(attachments.start_upload(data, request.user["uid"])),201
+    except attachments.UploadError as e:
+        return jsonify({"error": str(e)}), e.status
+
+@app.route('/chat/attachments/<upload_id>',methods=['GET','PATCH','DELETE'])
+@firebase_uid_required
+def attachment_upload(upload_id):
+    # only the user who started an upload can see, extend or cancel it
+    owner=request.user["uid"]
+    try:
+        if request.method=='GET':
+            return jsonify(attachments.upload_status(upload_id, owner)),200
+        if request.method=='DELETE':
+            attachments.cancel_upload(upload_id, owner)
+            return jsonify({"upload":"cancelled"}),200
+        offset=int(request.headers.get('Upload-Offset', 0))
+        return jsonify(attachments.append_chunk(upload_id, offset, request.stream, owner)),200
+    except attachments.UploadError as e:
+        return jsonify({"error": str(e), "offset": e.offset}), e.status
+    except ValueError:
+        return jsonify({"error": "Upload-Offset must be an integer"}), 400
+
+@app.route('/chat/attachments/blob/<attachment_id>',methods=['GET'])
+def download_attachment(attachment_id):
+    if not attachments.store.exists(attachment_id):
+        return jsonify({"error": "Attachment not found"}), 404
+    meta=attachments.store.meta(attachment_id)
+    # the content type is whatever the uploader declared: only safe images are shown inline
+    inline=meta["content_type"] in attachments.INLINE_TYPES
+    # conditional=True answers Range requests with 206 and If-None-Match with 304
+    response=send_file(attachments.store.blob_path(attachment_id),
+                       mimetype=meta["content_type"] if inline else "application/octet-stream",
+                       as_attachment=not inline,
+                       download_name=request.args.get('name') or attachment_id,
+                       conditional=True, etag=attachment_id, max_age=31536000)
+    response.cache_control.immutable=True
+    response.headers["X-Content-Type-Options"]="nosniff"
+    response.headers["Content-Security-Policy"]="sandbox"
+    return response
 
 @app.route('/verify/member',methods=['POST'])
-def verify_member():
- data=request.json
+@validate_json(verify_member_schema)
+def verify_member(data):
  return member_sql(data)
 
 @app.route('/change/sprint/status',methods=['POST'])
-def change_sprint_status():
- data=request.json
+@validate_json(change_sprint_status_schema)
+def change_sprint_status(data):
  return change_sprint_status_sql(data)
 
 
@@ -487,6 +595,7 @@ def change_sprint_status():
 
 #1
 @app.route('/project/view_details', methods=['GET'])
+@project_conditional()
 def view_project_details():
     project_id = request.args.get("project_id")
     #print(f"Received project_id: {project_id}") 
@@ -503,6 +612,7 @@ def view_project_details():
 
 #2
 @app.route('/project/analytics', methods=['GET'])
+@project_conditional(daily=True)
 def project_analytics():
     project_id = request.args.get("project_id")
     if not project_id:
@@ -523,6 +633,7 @@ def project_analytics():
 
 #3   
 @app.route('/project/view_tasks', methods=['GET'])
+@project_conditional()
 def view_sprint_tasks():
     project_id = request.args.get("project_id")
     if not project_id:
@@ -542,6 +653,7 @@ def view_sprint_tasks():
     
 #4
 @app.route('/project/view_sprints', methods=['GET'])
+@project_conditional()
 def get_sprints_route():
     """API endpoint to fetch sprints for a given project."""
     project_id = request.args.get("project_id")
@@ -638,12 +750,9 @@ def update_task_routes():
        # updates["status"] = STATUS_MAPPING[updates["status"]]
     status=STATUS_MAPPING[data["status"]]
     try:
-        with engine.connect() as conn:
+        with db_connect() as conn:
             print(f"Checking if task {task_id} exists...")  
-            result = conn.execute(
-                text("SELECT COUNT(*) FROM task WHERE id = :task_id"),
-                {"task_id": task_id}
-            ).scalar()
+            result = conn.execute(queries.TASK_COUNT, {"task_id": task_id}).scalar()
 
             if result == 0:
                 return jsonify({"error": "Task ID does not exist"}), 404
@@ -680,12 +789,9 @@ def update_task_route():
         updates["status"] = STATUS_MAPPING[updates["status"]]
 
     try:
-        with engine.connect() as conn:
+        with db_connect() as conn:
             print(f"Checking if task {task_id} exists...")  
-            result = conn.execute(
-                text("SELECT COUNT(*) FROM task WHERE id = :task_id"),
-                {"task_id": task_id}
-            ).scalar()
+            result = conn.execute(queries.TASK_COUNT, {"task_id": task_id}).scalar()
 
             if result == 0:
                 return jsonify({"error": "Task ID does not exist"}), 404
@@ -807,7 +913,7 @@ def promote_moderator_route():
         return jsonify({"error": "Missing project_id or user_id"}), 400
 
     try:
-        with engine.connect() as conn:
+        with db_connect() as conn:
             success, message = promote_to_moderator(conn, project_id, user_id)
             if success:
                 return jsonify({"message": message}), 200
@@ -902,6 +1008,53 @@ def create_sprint_route():
     return create_sprint(user_id, project_id, name, start_date, end_date)
  
 
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Runtime counters used to size the connection pool and the session cache, and HTTP cache hits."""
+    return jsonify({"db_pool": pool_status(), "session_cache": session_cache.stats(), "http": http_cache.stats()}), 200
+
+
+@app.cli.command("migrate")
+def migrate_command():
+    """Apply pending schema migrations."""
+    applied = migrate()
+    if not applied:
+        print("Database is up to date")
+
+
+@app.cli.command("check-indexes")
+def check_indexes_command():
+    """Fail if a hot query is not planned on the index meant for it."""
+    failures = check_query_plans()
+    for table, index, statement, used in failures:
+        print(f"{table} not using {index} (plan uses {used}): {statement}")
+    if failures:
+        raise click.ClickException(f"{len(failures)} hot queries are not using their index")
+    print("All hot queries use their index")
+
+
+@app.cli.command("rollups")
+@click.argument("action", type=click.Choice(["verify", "rebuild"]))
+@click.option("--project-id", type=int, default=None, help="Limit to one project.")
+def rollups_command(action, project_id):
+    """Verify the analytics rollups against the task table, or rebuild them."""
+    with engine.begin() as conn:
+        if action == "rebuild":
+            rebuild_task_rollups(conn, project_id)
+            print("Rollups rebuilt")
+            return
+
+        drift = verify_task_rollups(conn, project_id)
+
+    for row in drift["sprint"]:
+        print(f"sprint drift: {row}")
+    for row in drift["assignee"]:
+        print(f"assignee drift: {row}")
+    if drift["sprint"] or drift["assignee"]:
+        raise click.ClickException(f"{len(drift['sprint']) + len(drift['assignee'])} rollup rows drifted")
+    print("Rollups match the task table")
+
      
 if __name__ == "__main__":
     import os
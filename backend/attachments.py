@@ -0,0 +1,253 @@
+# attachments.py
+# Chat attachments: resumable chunked uploads into a content-addressed store, so files never
+# travel through Socket.IO events or the messages table. A chat message only carries the
+# attachment_id (the file's sha256).
+#
+# Upload flow (routes in app.py):
+#   POST /chat/attachments            {file_name, size, content_type, sha256?} -> upload_id, offset
+#   PATCH /chat/attachments/<id>      raw bytes, Upload-Offset header          -> offset
+#   GET /chat/attachments/<id>        current offset, to resume after a dropped connection
+#   GET /chat/attachments/blob/<sha>  the file, with Range support
+# Uploads belong to the user who started them (firebase_uid_required on the routes); each user
+# has at most MAX_OPEN_UPLOADS unfinished, and idle ones are deleted after UPLOAD_TTL_SECONDS.
+import fcntl
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+
+CHUNK_SIZE = 64 * 1024
+MAX_ATTACHMENT_BYTES = int(os.getenv("MAX_ATTACHMENT_BYTES", 25 * 1024 * 1024))
+# unfinished uploads per user, and how long one may sit idle before it is deleted
+MAX_OPEN_UPLOADS = int(os.getenv("MAX_OPEN_UPLOADS", 5))
+UPLOAD_TTL_SECONDS = int(os.getenv("UPLOAD_TTL_SECONDS", 24 * 60 * 60))
+
+# Served inline from the API origin; anything else is a download, so an upload declared as
+# text/html (or sniffed as it) never renders next to the session cookies
+INLINE_TYPES = {"image/png", "image/jpeg", "image/gif", "image/webp"}
+
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadError(Exception):
+    """Upload problem the client can fix; status is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class LocalStore:
+    """Blobs on local disk under root/blobs/<sha[:2]>/<sha>, uploads in progress under root/uploads.
+
+    Stands in for an object store: several processes (app.py, sender.py) can share root.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+        os.makedirs(os.path.join(root, "uploads"), exist_ok=True)
+
+    def blob_path(self, sha):
+        if not _SHA256.match(sha or ""):
+            raise UploadError("Invalid attachment id")
+        return os.path.join(self.root, "blobs", sha[:2], sha)
+
+    def exists(self, sha):
+        try:
+            return os.path.exists(self.blob_path(sha))
+        except UploadError:
+            return False
+
+    def meta(self, sha):
+        with open(self.blob_path(sha) + ".json") as f:
+            return json.load(f)
+
+    def upload_paths(self, upload_id):
+        if not _UPLOAD_ID.match(upload_id or ""):
+            raise UploadError("Unknown upload", 404)
+        base = os.path.join(self.root, "uploads", upload_id)
+        return base + ".part", base + ".json"
+
+    def put(self, part_path, sha, meta):
+        """Move a finished upload into place; if the blob is already stored, keep that one."""
+        path = self.blob_path(sha)
+        if os.path.exists(path):
+            os.remove(part_path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".json", "w") as f:
+            json.dump(meta, f)
+        os.replace(part_path, path)
+
+
+store = LocalStore(os.getenv("ATTACHMENT_STORE_DIR", os.path.join(os.path.dirname(__file__), "attachment_store")))
+
+
+def attachment_info(sha, meta):
+    return {"attachment_id": sha, "complete": True, "size": meta["size"], "content_type": meta["content_type"]}
+
+
+def start_upload(data, owner):
+    """Register an upload for owner (a uid). A known sha256 that is already stored completes at once."""
+    size = int(data["size"])
+    if size <= 0 or size > MAX_ATTACHMENT_BYTES:
+        raise UploadError(f"Attachments must be between 1 and {MAX_ATTACHMENT_BYTES} bytes", 413)
+    meta = {
+        "file_name": data["file_name"],
+        "size": size,
+        "content_type": data.get("content_type") or "application/octet-stream",
+        "sha256": (data.get("sha256") or "").lower() or None,
+        "owner": owner,
+    }
+    if meta["sha256"] and store.exists(meta["sha256"]):
+        return attachment_info(meta["sha256"], store.meta(meta["sha256"]))
+
+    # expire abandoned uploads here rather than in a thread: every new upload pays for one scan
+    sweep_uploads()
+    if open_uploads(owner) >= MAX_OPEN_UPLOADS:
+        raise UploadError(f"At most {MAX_OPEN_UPLOADS} unfinished uploads; finish or cancel one first", 429)
+
+    upload_id = uuid.uuid4().hex
+    part_path, meta_path = store.upload_paths(upload_id)
+    open(part_path, "wb").close()
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    return {"upload_id": upload_id, "offset": 0, "size": size, "complete": False}
+
+
+@contextmanager
+def _locked(part_path):
+    """The upload's .part file, open for writing under an exclusive lock: one writer per upload,
+    across threads and processes. The lock is released when the file is closed."""
+    try:
+        f = open(part_path, "r+b")  # never creates, unlike "ab"
+    except FileNotFoundError:
+        raise UploadError("Unknown upload", 404)
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield f
+
+
+def _upload_metas():
+    """(upload_id, meta) of every unfinished upload."""
+    root = os.path.join(store.root, "uploads")
+    for name in os.listdir(root):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(root, name)) as f:
+                yield name[:-5], json.load(f)
+        except (OSError, ValueError):
+            continue  # finished or cancelled while we looked
+
+
+def open_uploads(owner):
+    return sum(1 for _, meta in _upload_metas() if meta.get("owner") == owner)
+
+
+def sweep_uploads(now=None):
+    """Delete uploads with no new bytes for UPLOAD_TTL_SECONDS; returns how many went."""
+    now = time.time() if now is None else now
+    removed = 0
+    for upload_id, _ in list(_upload_metas()):
+        part_path, meta_path = store.upload_paths(upload_id)
+        try:
+            f = open(part_path, "r+b")
+        except FileNotFoundError:
+            f = None
+        try:
+            if f is not None:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # a chunk is being written right now
+                idle_since = os.fstat(f.fileno()).st_mtime
+            else:
+                idle_since = os.path.getmtime(meta_path)
+            if now - idle_since < UPLOAD_TTL_SECONDS:
+                continue
+            for path in (meta_path, part_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            continue
+        finally:
+            if f is not None:
+                f.close()
+    return removed
+
+
+def _load_upload(upload_id, owner=None):
+    part_path, meta_path = store.upload_paths(upload_id)
+    if not os.path.exists(meta_path):
+        raise UploadError("Unknown upload", 404)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    # someone else's upload looks the same as one that does not exist
+    if owner is not None and meta.get("owner") != owner:
+        raise UploadError("Unknown upload", 404)
+    return part_path, meta_path, meta
+
+
+def upload_status(upload_id, owner=None):
+    part_path, _, meta = _load_upload(upload_id, owner)
+    return {"upload_id": upload_id, "offset": os.path.getsize(part_path), "size": meta["size"], "complete": False}
+
+
+def append_chunk(upload_id, offset, stream, owner=None):
+    """Write the request body at offset, which must be where the upload stopped."""
+    part_path, meta_path, meta = _load_upload(upload_id, owner)
+
+    with _locked(part_path) as f:
+        # whoever held the lock may have finished or cancelled the upload, or moved the offset
+        if not os.path.exists(meta_path):
+            raise UploadError("Upload already finished or cancelled", 409)
+        current = f.seek(0, os.SEEK_END)
+        if offset != current:
+            raise UploadError("Offset does not match the upload", 409, offset=current)
+
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            current += len(chunk)
+            if current > meta["size"]:
+                f.truncate(offset)
+                raise UploadError("Upload is larger than its declared size", 413, offset=offset)
+            f.write(chunk)
+        f.flush()
+
+        if current < meta["size"]:
+            return {"upload_id": upload_id, "offset": current, "size": meta["size"], "complete": False}
+        return _finish_upload(part_path, meta_path, meta)
+
+
+def _finish_upload(part_path, meta_path, meta):
+    digest = hashlib.sha256()
+    with open(part_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    sha = digest.hexdigest()
+    if meta["sha256"] and meta["sha256"] != sha:
+        os.remove(part_path)
+        os.remove(meta_path)
+        raise UploadError("Upload does not match its sha256", 422)
+
+    store.put(part_path, sha, {"size": meta["size"], "content_type": meta["content_type"]})
+    os.remove(meta_path)
+    return attachment_info(sha, store.meta(sha))
+
+
+def cancel_upload(upload_id, owner=None):
+    part_path, meta_path, _ = _load_upload(upload_id, owner)
+    with _locked(part_path):
+        for path in (part_path, meta_path):
+            if os.path.exists(path):
+                os.remove(path)
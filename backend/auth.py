@@ -5,6 +5,11 @@ from firebase_admin import credentials, auth
 from functools import wraps
 import os
 import json
+import threading
+import time
+from cachetools import TTLCache
+import jwt
+import session_tokens
 
 # Initialize Firebase Admin SDK
 def get_firebase_credentials():
@@ -32,22 +37,153 @@ if not firebase_admin._apps:
 # Create a blueprint for authentication
 #auth_bp = Blueprint('auth', __name__)
 
+# Verified sessions, so protected routes do not call Firebase on every request.
+# Keyed by (uid, fingerprint cookie). Unknown uids are remembered for a shorter time.
+# SESSION_CACHE_REDIS_URL adds a cache shared by every worker behind the per-process one.
+class SessionCache:
+    def __init__(self, ttl, negative_ttl, maxsize, shared=None, timer=time.monotonic):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.shared = shared
+        self._valid = TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+        self._invalid = TTLCache(maxsize=maxsize, ttl=negative_ttl, timer=timer)
+        self._lock = threading.Lock()
+        self.counts = {"hits": 0, "negative_hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _shared_key(self, key):
+        return f"session:{key[0]}:{key[1]}"
+
+    def get(self, key):
+        """(True, session) for a cached valid session, (True, None) for a cached invalid uid, else (False, None)."""
+        with self._lock:
+            if key in self._valid:
+                self.counts["hits"] += 1
+                return True, self._valid[key]
+            if key in self._invalid:
+                self.counts["negative_hits"] += 1
+                return True, None
+        if self.shared is not None:
+            try:
+                value = self.shared.get(self._shared_key(key))
+            except Exception as e:
+                print(f"session cache backend error: {e}")
+                value = None
+            if value is not None:
+                self._count("shared_hits")
+                session = json.loads(value)
+                with self._lock:
+                    if session is None:
+                        self._invalid[key] = True
+                    else:
+                        self._valid[key] = session
+                return True, session
+        self._count("misses")
+        return False, None
+
+    def set(self, key, session):
+        with self._lock:
+            if session is None:
+                self._invalid[key] = True
+            else:
+                self._valid[key] = session
+        if self.shared is not None:
+            try:
+                self.shared.set(self._shared_key(key), json.dumps(session),
+                                ex=self.negative_ttl if session is None else self.ttl)
+            except Exception as e:
+                print(f"session cache backend error: {e}")
+
+    def invalidate(self, key):
+        with self._lock:
+            self._valid.pop(key, None)
+            self._invalid.pop(key, None)
+            self.counts["invalidations"] += 1
+        if self.shared is not None:
+            try:
+                self.shared.delete(self._shared_key(key))
+            except Exception as e:
+                print(f"session cache backend error: {e}")
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, size=len(self._valid), negative_size=len(self._invalid))
+
+
+def make_session_cache():
+    url = os.getenv("SESSION_CACHE_REDIS_URL")
+    shared = None
+    if url:
+        from presence import redis_client
+        shared = redis_client(url)
+    return SessionCache(
+        ttl=int(os.getenv("SESSION_CACHE_TTL_SECONDS", 300)),
+        negative_ttl=int(os.getenv("SESSION_CACHE_NEGATIVE_TTL_SECONDS", 60)),
+        maxsize=int(os.getenv("SESSION_CACHE_SIZE", 10000)),
+        shared=shared,
+    )
+
+
+session_cache = make_session_cache()
+
+
+def session_key(uid, fingerprint):
+    return (uid, fingerprint or "")
+
+
+def verified_session(uid, fingerprint):
+    """Session for uid, from the cache or from Firebase; None if the uid is not a Firebase user."""
+    key = session_key(uid, fingerprint)
+    cached, session = session_cache.get(key)
+    if cached:
+        return session
+    try:
+        user = auth.get_user(uid)
+    except (auth.UserNotFoundError, ValueError):
+        # no such user, or not a well-formed uid
+        session_cache.set(key, None)
+        return None
+    session = {"uid": user.uid, "email": user.email, "name": user.display_name}
+    session_cache.set(key, session)
+    return session
+
+
 # Custom Decorator for Firebase UID Authentication
 def firebase_uid_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        # Signed session token: verified locally, no network call
+        token = request.cookies.get(session_tokens.COOKIE_NAME)
+        if token:
+            try:
+                claims = session_tokens.verify(token)
+            except (session_tokens.UnknownKeyError, jwt.InvalidSignatureError):
+                # signed by another worker's or a retired key: check the uid cookie below instead
+                claims = None
+            except jwt.InvalidTokenError:
+                return jsonify({"message": "Unauthorized"}), 401
+            if claims:
+                request.user = {"uid": claims["uid"], "roll_no": claims.get("roll_no"), "role": claims.get("role")}
+                return f(*args, **kwargs)
+
+        # Logins from before session tokens only have the uid cookie
         uid = request.cookies.get('uid')
-        print(uid,"ss")
         #print("f")
         if not uid:
             return jsonify({"message": "Unauthorized"}), 401
 
         try:
-            user = auth.get_user(uid)
+            user = verified_session(uid, request.cookies.get('fingerprint'))
         except firebase_admin.exceptions.FirebaseError as e:
+            # not cached: Firebase being unreachable says nothing about the uid
             return jsonify({"message": "Unauthorized"}), 401
-        
-        # Attach user data to the request
+        if user is None:
+            return jsonify({"message": "Unauthorized"}), 401
+
+        # Attach user data (uid, email, name) to the request
         request.user = user
         return f(*args, **kwargs)
     return decorated_function
@@ -0,0 +1,140 @@
+# Sprint board (/project/view_tasks): the old per-sprint, per-task walk against get_sprint_tasks's
+# single board query, at 1k, 10k and 100k tasks on one project. Counts the statements each sends.
+# Needs a scratch Postgres: the tables are created in a "bench_board" schema and dropped after.
+# Run from backend/: DATABASE_URL=postgresql://... python bench/bench_board.py [tasks ...]
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCHEMA = "bench_board"
+url = os.environ["DATABASE_URL"]
+os.environ["DATABASE_URL"] = url + ("&" if "?" in url else "?") + f"options=-csearch_path%3D{SCHEMA}"
+
+from sqlalchemy import event, text
+
+import db
+import sql
+
+SCHEMA_SQL = [
+    f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE",
+    f"CREATE SCHEMA {SCHEMA}",
+    'CREATE TABLE "User" (roll_no TEXT PRIMARY KEY, name TEXT)',
+    'CREATE TABLE "Project" (project_id INTEGER PRIMARY KEY, title TEXT)',
+    """CREATE TABLE task (id SERIAL PRIMARY KEY, project_id INTEGER, sprint_number INTEGER,
+           description TEXT, assigned_to TEXT, points INTEGER, status TEXT)""",
+    # migration 2
+    "CREATE INDEX ix_task_project_sprint_status ON task (project_id, sprint_number, status)",
+    """INSERT INTO "User" SELECT 'u' || i, 'User ' || i FROM generate_series(0, 499) i""",
+    """INSERT INTO "Project" VALUES (1, 'board'), (2, 'other')""",
+]
+
+# a board of :tasks tasks on project 1, 100 per sprint, as many again on project 2;
+# one in ten unassigned, and some assignees with no "User" row
+SEED = text("""
+    INSERT INTO task (project_id, sprint_number, description, assigned_to, points, status)
+    SELECT p, i / 100 + 1, 'task ' || i, CASE WHEN i % 10 = 0 THEN NULL ELSE 'u' || i % 600 END,
+           i % 8, (ARRAY['pending', 'review', 'done'])[i % 3 + 1]
+    FROM generate_series(1, 2) p, generate_series(0, :tasks - 1) i
+""")
+
+statements = 0
+
+
+@event.listens_for(db.engine, "before_cursor_execute")
+def count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+def old_sprint_tasks(project_id):
+    """get_sprint_tasks before the board query: a query per sprint and one per assigned task."""
+    with db.engine.connect() as conn:
+        project = conn.execute(text('SELECT project_id FROM "Project" WHERE project_id = :project_id'),
+                               {"project_id": project_id}).mappings().fetchone()
+        if not project:
+            return None
+        sprints = conn.execute(text("""
+            SELECT DISTINCT sprint_number,
+            (SELECT COUNT(*) FROM task t2 WHERE t2.project_id = :project_id AND t2.sprint_number = t.sprint_number) AS total_tasks,
+            (SELECT COUNT(*) FROM task t2 WHERE t2.project_id = :project_id AND t2.sprint_number = t.sprint_number AND t2.status = 'done') AS completed_tasks
+            FROM task t
+            WHERE t.project_id = :project_id AND t.sprint_number IS NOT NULL
+            ORDER BY sprint_number
+        """), {"project_id": project_id}).mappings().all()
+        conn.execute(text("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = 'task' AND column_name = 'title'
+        """)).fetchone()
+        sprint_data = []
+        for sprint in sprints:
+            tasks = conn.execute(text("""
+                SELECT id, description, assigned_to, points, status FROM task
+                WHERE project_id = :project_id
+                  AND (sprint_number = :sprint_number OR (:sprint_number IS NULL AND sprint_number IS NULL))
+                ORDER BY status
+            """), {"project_id": project_id, "sprint_number": sprint["sprint_number"]}).mappings().all()
+            categorized = {"todo": [], "in_progress": [], "completed": []}
+            for task in tasks:
+                assignee_name = None
+                if task["assigned_to"]:
+                    user = conn.execute(text('SELECT name FROM "User" WHERE roll_no = :roll_no'),
+                                        {"roll_no": task["assigned_to"]}).mappings().fetchone()
+                    assignee_name = user["name"] if user else task["assigned_to"]
+                task_data = {"id": task["id"], "description": task["description"], "assigned_to": task["assigned_to"],
+                             "assignee_name": assignee_name, "points": task["points"]}
+                status = task["status"]
+                if status == "pending":
+                    categorized["todo"].append(task_data)
+                elif status == "review":
+                    categorized["in_progress"].append(task_data)
+                else:
+                    categorized["completed"].append(task_data)
+            total, completed = int(sprint["total_tasks"]), int(sprint["completed_tasks"])
+            sprint_data.append({
+                "sprint_number": sprint["sprint_number"], "sprint_name": f"Sprint {sprint['sprint_number']}",
+                "total_tasks": total, "completed_tasks": completed,
+                "completion_percentage": round(completed / total * 100 if total else 0, 2),
+                "tasks": categorized,
+            })
+        return sprint_data
+
+
+def by_id(board):
+    for sprint in board:
+        for tasks in sprint["tasks"].values():
+            tasks.sort(key=lambda task: task["id"])
+    return board
+
+
+def measure(load, repeat):
+    global statements
+    statements = 0
+    load()
+    queries_per_load = statements
+    return queries_per_load, min(timeit.repeat(load, number=1, repeat=repeat))
+
+
+def main(sizes=(1000, 10000, 100000), repeat=3):
+    with db.engine.begin() as conn:
+        for statement in SCHEMA_SQL:
+            conn.execute(text(statement))
+    try:
+        print(f"{'tasks':>7} {'old queries':>12} {'old ms':>9} {'new queries':>12} {'new ms':>9}")
+        for size in sizes:
+            with db.engine.begin() as conn:
+                conn.execute(text("TRUNCATE task"))
+                conn.execute(SEED, {"tasks": size})
+                conn.execute(text("ANALYZE"))
+            assert by_id(old_sprint_tasks(1)) == by_id(sql.get_sprint_tasks(1))
+            old_queries, old_time = measure(lambda: old_sprint_tasks(1), 1 if size > 10000 else repeat)
+            new_queries, new_time = measure(lambda: sql.get_sprint_tasks(1), repeat)
+            print(f"{size:>7} {old_queries:>12} {old_time * 1000:>9.1f} {new_queries:>12} {new_time * 1000:>9.1f}")
+    finally:
+        with db.engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or (1000, 10000, 100000))
@@ -0,0 +1,25 @@
+# Decrypting a page of chat history: a PyCryptodome AES object per message (decrypt_message,
+# what history used before) against one AESGCM instance for the page (decrypt_messages).
+# Run from backend/: python bench/bench_chat_decrypt.py [messages]
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql import CHAT_AES_KEY, chat_cipher, decrypt_message, decrypt_messages, encrypt_message
+
+
+def main(count=10000, repeat=5):
+    messages = [encrypt_message(f"message {i} " + "x" * 80, CHAT_AES_KEY) for i in range(count)]
+    assert decrypt_messages(messages, chat_cipher) == [decrypt_message(m, CHAT_AES_KEY) for m in messages]
+
+    before = min(timeit.repeat(lambda: [decrypt_message(m, CHAT_AES_KEY) for m in messages], number=1, repeat=repeat))
+    after = min(timeit.repeat(lambda: decrypt_messages(messages, chat_cipher), number=1, repeat=repeat))
+    print(f"{count} messages")
+    print(f"per-message cipher: {before * 1000:8.1f} ms")
+    print(f"decrypt_messages:   {after * 1000:8.1f} ms  ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
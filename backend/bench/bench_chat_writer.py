@@ -0,0 +1,95 @@
+# Chat persistence: the old chat_message path (encrypt, insert one row, commit, decrypt twice, all
+# inside the socket handler) against ChatWriter, where the handler only queues the message and
+# a background worker inserts batches. Reports messages/second seen by the handler and until
+# every message is in the table. rtt_ms adds a sleep per statement, standing in for a remote database.
+# Needs a scratch Postgres: the table is created in a "bench_chat" schema and dropped after.
+# Run from backend/: DATABASE_URL=postgresql://... python bench/bench_chat_writer.py [messages] [rtt_ms]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCHEMA = "bench_chat"
+url = os.environ["DATABASE_URL"]
+os.environ["DATABASE_URL"] = url + ("&" if "?" in url else "?") + f"options=-csearch_path%3D{SCHEMA}"
+
+from sqlalchemy import event, text
+
+import db
+from chat_store import ChatWriter
+from sql import CHAT_AES_KEY, decrypt_message, encrypt_message
+
+SCHEMA_SQL = [
+    f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE",
+    f"CREATE SCHEMA {SCHEMA}",
+    """CREATE TABLE messages (id SERIAL PRIMARY KEY, username TEXT, usergroup TEXT, message TEXT,
+           type TEXT, file_name TEXT, created_at TIMESTAMP DEFAULT now())""",
+]
+
+rtt = 0.0
+
+
+@event.listens_for(db.engine, "before_cursor_execute")
+def round_trip(conn, cursor, statement, parameters, context, executemany):
+    if rtt:
+        time.sleep(rtt)
+
+
+def old_insert_message(message):
+    """sql.insert_message before ChatWriter, minus its prints."""
+    with db.engine.connect() as conn:
+        encrypted_msg = encrypt_message(message['message'], CHAT_AES_KEY)
+        conn.execute(text("""
+            INSERT INTO messages (username, usergroup, message, type, file_name)
+            VALUES (:val1, :val2, :val3, :val4, :val5)
+        """), {"val1": message['username'], "val2": "general", "val3": encrypted_msg,
+               "val4": message['type'], "val5": message['fileName']})
+        conn.commit()
+        decrypt_message(encrypted_msg, CHAT_AES_KEY)
+        decrypt_message(encrypted_msg, CHAT_AES_KEY)
+
+
+def stored():
+    with db.engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM messages")).scalar()
+
+
+def main(count=5000, rtt_ms=0.0):
+    global rtt
+    with db.engine.begin() as conn:
+        for statement in SCHEMA_SQL:
+            conn.execute(text(statement))
+    messages = [{"username": f"u{i % 50}", "usergroup": "general", "message": f"message {i} " + "x" * 60,
+                 "type": "text", "fileName": None} for i in range(count)]
+    rtt = rtt_ms / 1000
+    try:
+        start = time.perf_counter()
+        for message in messages:
+            old_insert_message(message)
+        old = time.perf_counter() - start
+        assert stored() == count
+
+        writer = ChatWriter()
+        writer.start()
+        start = time.perf_counter()
+        for message in messages:
+            writer.submit(message)
+        queued = time.perf_counter() - start
+        writer.close(timeout=600)
+        persisted = time.perf_counter() - start
+        assert stored() == 2 * count, writer.stats()
+
+        print(f"{count} messages, {rtt_ms:g} ms per statement; messages/second")
+        print(f"insert in the handler:  {count / old:10.0f}")
+        print(f"ChatWriter, handler:    {count / queued:10.0f}")
+        print(f"ChatWriter, persisted:  {count / persisted:10.0f}  ({writer.stats()['batches']} batches)")
+    finally:
+        rtt = 0.0
+        with db.engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 0.0)
@@ -0,0 +1,57 @@
+# JSON responses: Flask's default provider against OrjsonProvider, on payloads shaped like
+# /list/users and /project/view_tasks (dates and Decimals included, as the queries return them).
+# Run from backend/: python bench/bench_json.py [users]
+import os
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from json_provider import OrjsonProvider
+
+
+def list_users(count):
+    return {"projects": [{
+        "roll_no": f"2021cs{i:04d}", "email": f"user{i}@iiitkottayam.ac.in", "past_experience": "Built a chat app",
+        "tech_stack": ["python", "react", "postgres"], "github_profile": f"https://github.com/user{i}",
+        "linkedin_profile": None, "role_type": "student", "rating": Decimal("4.25"), "email_update": True,
+        "project_update": False, "name": f"User {i}", "project_count": i % 7,
+    } for i in range(count)]}
+
+
+def view_tasks(sprints, tasks):
+    return {"sprints": [{
+        "sprint_number": s, "sprint_name": f"Sprint {s}", "total_tasks": tasks, "completed_tasks": tasks // 2,
+        "completion_percentage": 50.0,
+        "start_date": date(2025, 1, 1) + timedelta(days=14 * s),
+        "tasks": {"todo": [{"id": s * 1000 + t, "description": "Write the migration", "assigned_to": "2021cs0001",
+                            "assignee_name": "User 1", "points": Decimal(3), "title": f"Task {t}",
+                            "updated_at": datetime(2025, 1, 1, 12, 0)} for t in range(tasks)],
+                  "in_progress": [], "completed": []},
+    } for s in range(sprints)]}
+
+
+def main(users=5000, repeat=5):
+    default_app, orjson_app = Flask("default"), Flask("orjson")
+    default_app.json = DefaultJSONProvider(default_app)
+    orjson_app.json = OrjsonProvider(orjson_app)
+
+    for name, payload, number in [("/list/users", list_users(users), 10),
+                                  ("/project/view_tasks", view_tasks(20, 200), 10)]:
+        results = {}
+        for label, app in [("default", default_app), ("orjson", orjson_app)]:
+            with app.app_context():
+                size = len(app.json.response(payload).get_data())
+                seconds = min(timeit.repeat(lambda: app.json.response(payload).get_data(), number=number, repeat=repeat))
+            results[label] = seconds / number
+            print(f"{name:20} {label:8} {results[label] * 1000:8.2f} ms  {size:>9} bytes")
+        print(f"{name:20} {'speedup':8} {results['default'] / results['orjson']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,121 @@
+# Logins per second for one worker through /verify/user_id: ID token checked locally against
+# the cached signing keys, user_session upserted, session cookie signed. The Firestore login
+# record is a stand-in that takes firestore_ms, written the old way (inside the request) and the
+# new way (on the firestore_writes pool). The old /verify/google also slept 5 s per login,
+# which alone held a worker to 0.2 logins/second.
+# Needs a scratch Postgres (the tables go in a "bench_logins" schema, dropped after) and the
+# app's usual FIREBASE_CREDENTIALS; the signing key is generated here, nothing goes to Google.
+# Run from backend/: DATABASE_URL=postgresql://... python bench/bench_logins.py [logins] [firestore_ms]
+import datetime
+import os
+import sys
+import time
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCHEMA = "bench_logins"
+url = os.environ["DATABASE_URL"]
+os.environ["DATABASE_URL"] = url + ("&" if "?" in url else "?") + f"options=-csearch_path%3D{SCHEMA}"
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from sqlalchemy import text
+
+import app
+import db
+import id_tokens
+from migrations import MIGRATIONS
+
+PROJECT = "bench-project"
+SCHEMA_SQL = [
+    f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE",
+    f"CREATE SCHEMA {SCHEMA}",
+    'CREATE TABLE "User" (roll_no TEXT PRIMARY KEY, name TEXT, role_type TEXT)',
+    """INSERT INTO "User" SELECT 'user' || i, 'User ' || i, 'student' FROM generate_series(0, 9999) i""",
+]
+
+
+class FakeFirestore:
+    """users.document(..).set(..) that takes `delay` seconds, like a round trip to Firestore."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.writes = 0
+
+    def collection(self, name):
+        return self
+
+    def document(self, name):
+        return self
+
+    def set(self, values):
+        time.sleep(self.delay)
+        self.writes += 1
+
+
+class Inline:
+    """firestore_writes that runs the write before the request returns, as /verify/user_id used to."""
+
+    def submit(self, fn):
+        future = Future()
+        future.set_result(fn())
+        return future
+
+
+def tokens(count):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    id_tokens.signing_keys._keys = {"bench": key.public_key()}
+    id_tokens.signing_keys._fetched_at = time.time()
+    id_tokens.signing_keys._expires_at = time.time() + 3600
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [(f"uid{i}", jwt.encode({
+        "iss": f"https://securetoken.google.com/{PROJECT}", "aud": PROJECT, "sub": f"uid{i}",
+        "iat": now, "exp": now + datetime.timedelta(hours=1), "email": f"user{i}@iiitkottayam.ac.in",
+    }, key, algorithm="RS256", headers={"kid": "bench"})) for i in range(count)]
+
+
+def logins(client, signed):
+    start = time.perf_counter()
+    for uid, token in signed:
+        response = client.post("/verify/user_id", json={"idToken": token, "uid": uid, "fingerprint": "bench"})
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return len(signed) / (time.perf_counter() - start)
+
+
+def main(count=500, firestore_ms=50.0):
+    os.environ["FIREBASE_PROJECT_ID"] = PROJECT
+    with db.engine.begin() as conn:
+        for statement in SCHEMA_SQL:
+            conn.execute(text(statement))
+        # user_session and session_revocation
+        for step in sum((steps for version, _, steps in MIGRATIONS if version in (7, 8)), []):
+            conn.execute(text(step))
+    background = app.firestore_writes
+    try:
+        signed = tokens(count)
+        start = time.perf_counter()
+        for _, token in signed:
+            id_tokens.verify_id_token(token)
+        verify_rate = count / (time.perf_counter() - start)
+
+        app.db = FakeFirestore(firestore_ms / 1000)
+        client = app.app.test_client()
+        app.firestore_writes = Inline()
+        inline_rate = logins(client, signed)
+        app.firestore_writes = background
+        background_rate = logins(client, signed)
+
+        print(f"{count} logins, Firestore write {firestore_ms:g} ms; logins/second, one worker")
+        print(f"verify_id_token alone:          {verify_rate:8.0f}")
+        print(f"/verify/user_id, write inline:  {inline_rate:8.1f}")
+        print(f"/verify/user_id, write pooled:  {background_rate:8.1f}")
+    finally:
+        background.shutdown(wait=True)
+        with db.engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 50.0)
@@ -0,0 +1,110 @@
+# Project search at 100k projects: what the browser did before /search/projects (download the
+# whole project list, then match title, description and tags) against search_projects_sql on
+# the migration 3 search_vector and tag_list GIN indexes. Reports p50/p95 per query.
+# Needs a scratch Postgres: the tables are created in a "bench_search" schema and dropped after.
+# Run from backend/: DATABASE_URL=postgresql://... python bench/bench_search.py [projects]
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCHEMA = "bench_search"
+url = os.environ["DATABASE_URL"]
+os.environ["DATABASE_URL"] = url + ("&" if "?" in url else "?") + f"options=-csearch_path%3D{SCHEMA}"
+
+from sqlalchemy import text
+
+import db
+from migrations import MIGRATIONS
+from sql import PROJECT_COLUMNS, search_projects_sql
+
+SCHEMA_SQL = [
+    f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE",
+    f"CREATE SCHEMA {SCHEMA}",
+    """CREATE TABLE "Project" (project_id SERIAL PRIMARY KEY, admin_id TEXT, title TEXT, description TEXT,
+           start_date DATE, end_date DATE, members_required INTEGER, status TEXT, tags TEXT)""",
+]
+
+WORDS = ["react", "native", "flask", "postgres", "machine", "learning", "data", "science", "chat",
+         "mobile", "game", "compiler", "blockchain", "vision", "robotics", "network", "security",
+         "dashboard", "campus", "library", "attendance", "music", "health", "finance", "weather"]
+TAGS = ["python", "javascript", "ml", "web", "android", "rust", "go", "devops", "ui", "iot"]
+
+# titles and descriptions from WORDS plus a numbered word, so some terms are common and some rare
+SEED = text("""
+    INSERT INTO "Project" (admin_id, title, description, start_date, end_date, members_required, status, tags)
+    SELECT 'u' || i % 500,
+           w[i % 25 + 1] || ' ' || w[i / 25 % 25 + 1] || ' app',
+           'A ' || w[i / 7 % 25 + 1] || ' project about ' || w[i / 11 % 25 + 1] || ' and word' || i % 5000,
+           DATE '2025-01-01' + i % 365, DATE '2025-06-01' + i % 365, i % 6 + 1,
+           (ARRAY['Open', 'Closed'])[i % 2 + 1],
+           t[i % 10 + 1] || ', ' || t[i / 10 % 10 + 1]
+    FROM generate_series(0, :projects - 1) i, (SELECT CAST(:words AS text[]) AS w, CAST(:tags AS text[]) AS t) v
+""")
+
+SEARCHES = [
+    ("common word", {"q": "react"}),
+    ("two words", {"q": "machine learning"}),
+    ("prefix", {"q": "dashb"}),
+    ("rare word", {"q": "word4242"}),
+    ("word + tag", {"q": "chat", "tag": "rust"}),
+    ("tag only", {"tag": "iot", "status": "Open"}),
+]
+
+
+def browser_search(q, tag=None, status=None):
+    """Old way: every project over the wire, then a substring match on each."""
+    with db.engine.connect() as conn:
+        projects = conn.execute(text(f'SELECT {PROJECT_COLUMNS} FROM "Project" p')).mappings().all()
+    terms = q.lower().split() if q else []
+    found = []
+    for project in projects:
+        haystack = f"{project['title']} {project['description']} {project['tags']}".lower()
+        if all(term in haystack for term in terms) \
+                and (not tag or tag in [t.strip().lower() for t in project['tags'].split(',')]) \
+                and (not status or project['status'] == status):
+            found.append(project)
+    return found[:20]
+
+
+def timings(call, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main(count=100000, repeat=20):
+    with db.engine.begin() as conn:
+        for statement in SCHEMA_SQL:
+            conn.execute(text(statement))
+        conn.execute(SEED, {"projects": count, "words": WORDS, "tags": TAGS})
+        for step in next(steps for version, _, steps in MIGRATIONS if version == 3):
+            conn.execute(text(step))
+        conn.execute(text("ANALYZE"))
+    try:
+        print(f"{count} projects; ms, p50 / p95")
+        print(f"{'search':<12} {'browser':>17} {'/search/projects':>19} {'page 2':>17}")
+        for name, params in SEARCHES:
+            old = timings(lambda: browser_search(params.get("q"), params.get("tag"), params.get("status")),
+                          max(repeat // 4, 3))
+            new = timings(lambda: search_projects_sql(params), repeat)
+            cursor = search_projects_sql(params)["next_cursor"]
+            if cursor:
+                page2 = timings(lambda: search_projects_sql({**params, "cursor": cursor}), repeat)
+                page2 = f"{page2[0]:>8.1f} / {page2[1]:>6.1f}"
+            else:
+                page2 = f"{'-':>17}"
+            print(f"{name:<12} {old[0]:>8.1f} / {old[1]:>6.1f} {new[0]:>10.1f} / {new[1]:>6.1f} {page2}")
+    finally:
+        with db.engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,57 @@
+# Request validation: building a marshmallow Schema in every request (what the routes did
+# before) against validate_json, which builds it once per route.
+# Run from backend/: python bench/bench_validation.py [requests]
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify, request
+
+from data_valid import add_project_schema, validate_json
+
+PAYLOAD = {"user_id": "2021cs0001", "title": "Collabsphere", "description": "Project board for students",
+           "start_date": "2025-01-01", "end_date": "2025-04-30", "members_required": 4,
+           "status": "Active", "tags": "flask,react"}
+
+app = Flask(__name__)
+
+
+@app.route("/before", methods=["POST"])
+def before():
+    data = request.json
+    errors = add_project_schema().validate(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    return jsonify({"ok": True})
+
+
+@app.route("/after", methods=["POST"])
+@validate_json(add_project_schema)
+def after(data):
+    return jsonify({"ok": True})
+
+
+def main(count=5000, repeat=5):
+    client = app.test_client()
+    assert client.post("/before", json=PAYLOAD).status_code == 200
+    assert client.post("/after", json=PAYLOAD).status_code == 200
+
+    schema = add_project_schema()
+    build = min(timeit.repeat(lambda: add_project_schema().validate(PAYLOAD), number=count, repeat=repeat))
+    reuse = min(timeit.repeat(lambda: schema.load(PAYLOAD), number=count, repeat=repeat))
+    print(f"{count} validations of an add_project payload")
+    print(f"schema per call:      {build / count * 1e6:8.1f} us")
+    print(f"one schema:           {reuse / count * 1e6:8.1f} us  ({build / reuse:.1f}x)")
+
+    count //= 5
+    route_before = min(timeit.repeat(lambda: client.post("/before", json=PAYLOAD), number=count, repeat=repeat))
+    route_after = min(timeit.repeat(lambda: client.post("/after", json=PAYLOAD), number=count, repeat=repeat))
+    print(f"{count} requests through the Flask test client")
+    print(f"route, schema per request: {route_before / count * 1e6:8.1f} us")
+    print(f"route, validate_json:      {route_after / count * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,134 @@
+# chat_store.py
+# Write-behind persistence for chat messages: socket handlers queue a message and broadcast
+# straight away, a background worker encrypts and inserts the queue in batches.
+import atexit
+import os
+import queue
+import threading
+import time
+
+from db import engine
+from sql import insert_messages
+
+_STOP = object()
+
+
+class ChatWriter:
+    """Bounded queue of chat messages, written in batches of up to batch_size.
+
+    A batch is written once it is full or flush_interval seconds after its first message.
+    When the queue is full, submit() waits up to put_timeout for room and then raises queue.Full,
+    so a slow database slows senders down instead of growing memory.
+    """
+
+    def __init__(self, batch_size=100, max_queue=10000, flush_interval=0.2, put_timeout=2.0,
+                 retries=3):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.retries = retries
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.written = 0
+        self.rejected = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="chat-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def submit(self, message):
+        try:
+            self._queue.put(message, timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise
+        with self._lock:
+            self.queued += 1
+
+    def close(self, timeout=10):
+        """Write whatever is still queued and stop the worker."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "written": self.written,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "batches": self.batches,
+                "backlog": self._queue.qsize(),
+            }
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+        # drain on shutdown
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        for start in range(0, len(batch), self.batch_size):
+            self._flush(batch[start:start + self.batch_size])
+
+    def _flush(self, batch):
+        for attempt in range(1, self.retries + 1):
+            try:
+                write_batch(batch)
+                with self._lock:
+                    self.written += len(batch)
+                    self.batches += 1
+                return
+            except Exception as e:
+                print(f"Error writing {len(batch)} chat messages (attempt {attempt}): {e}")
+                time.sleep(0.5 * attempt)
+        with self._lock:
+            self.failed += len(batch)
+
+
+def write_batch(batch):
+    with engine.begin() as conn:
+        insert_messages(conn, batch)
+
+
+def make_writer():
+    return ChatWriter(
+        batch_size=int(os.getenv("CHAT_BATCH_SIZE", 100)),
+        max_queue=int(os.getenv("CHAT_QUEUE_SIZE", 10000)),
+        flush_interval=float(os.getenv("CHAT_FLUSH_SECONDS", 0.2)),
+        put_timeout=float(os.getenv("CHAT_PUT_TIMEOUT_SECONDS", 2)),
+    )
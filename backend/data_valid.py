@@ -1,4 +1,6 @@
-from marshmallow import Schema, fields,INCLUDE,validate,EXCLUDE
+from marshmallow import Schema, fields,INCLUDE,validate,EXCLUDE,ValidationError
+from flask import request, jsonify
+from functools import wraps
 
 
 class UserSchema(Schema):
@@ -71,8 +73,11 @@ class apply_mentors_status_takeback_schema(Schema):
 
 class accept_mentor_schema(Schema):
     project_id=fields.Int(required=True)
-   # mentor_id=fields.Int(required=True)
-    status=fields.Str(validate=validate.OneOf(["accepted","rejected"]),required=True)
+    mentor_id=fields.Str(required=True)
+    status=fields.Str(validate=validate.OneOf(["Accepted","Rejected"]),required=True)
+
+    class Meta:
+        unknown = EXCLUDE
 
 class apply_project_schema(Schema):
     project_id=fields.Int(required=True)
@@ -99,17 +104,129 @@ class list_apply_project_schema(Schema):
     remarks = fields.Str(allow_none=True)  # Optional field, can be null
 
 
+class search_projects_schema(Schema):
+    q=fields.Str()
+    tag=fields.Str()
+    status=fields.Str(validate=validate.OneOf(["Active","Completed","Planning"]))
+    limit=fields.Int(validate=validate.Range(min=1,max=100))
+    cursor=fields.Str()
+
+    class Meta:
+        unknown = EXCLUDE
+
 class list_projects_scheme(Schema):
 
  #user_id=fields.Int(required=True)
+ status=fields.Str(validate=validate.OneOf(["Active","Completed","Planning"]))
+ tag=fields.Str()
+ start_from=fields.Date()
+ end_before=fields.Date()
+ limit=fields.Int(validate=validate.Range(min=1,max=100))
+ cursor=fields.Str()
  class Meta:
         unknown = EXCLUDE
 
+class notification_schema(Schema):
+    user_id=fields.Str()  # ignored, the session decides
+    limit=fields.Int(validate=validate.Range(min=1,max=100))
+    cursor=fields.Str()
+    since=fields.Str()
+    unread_only=fields.Bool()
+
+    class Meta:
+        unknown = EXCLUDE
+
+class notification_read_schema(Schema):
+    user_id=fields.Str()  # ignored, the session decides
+    ids=fields.List(fields.Int())
+    all=fields.Bool()
+
+    class Meta:
+        unknown = EXCLUDE
+
+class chat_history_schema(Schema):
+    project_id=fields.Int()
+    user_id=fields.Str()
+    limit=fields.Int(validate=validate.Range(min=1,max=200))
+    cursor=fields.Str()
+
+    class Meta:
+        unknown = EXCLUDE
+
+class start_upload_schema(Schema):
+    file_name=fields.Str(required=True)
+    size=fields.Int(required=True,validate=validate.Range(min=1))
+    content_type=fields.Str()
+    sha256=fields.Str(validate=validate.Regexp(r"^[0-9a-fA-F]{64}$"))
+
+    class Meta:
+        unknown = EXCLUDE
+
+class update_project_status_schema(Schema):
+    user_id=fields.Str(required=True)
+    project_id=fields.Int(required=True)
+    status=fields.Str(validate=validate.OneOf(["Accepted","Rejected"]),required=True)
+
+    class Meta:
+        unknown = EXCLUDE
+
+class admin_request_schema(Schema):
+    to_user_id=fields.Str(required=True)
+    project_id=fields.Int(required=True)
+    role=fields.Str(required=True)
+    remarks=fields.Str(allow_none=True)
+
+    class Meta:
+        unknown = EXCLUDE
+
+class admin_request_accept_schema(Schema):
+    user_id=fields.Str(required=True)
+    project_id=fields.Int(required=True)
+    status=fields.Str(validate=validate.OneOf(["Accepted","Rejected"]),required=True)
 
+    class Meta:
+        unknown = EXCLUDE
 
+class verify_member_schema(Schema):
+    member_id=fields.Str(required=True)
+    project_id=fields.Int(required=True)
 
+    class Meta:
+        unknown = EXCLUDE
 
+class change_sprint_status_schema(Schema):
+    project_id=fields.Int(required=True)
+    sprint_id=fields.Int(required=True)
+    status=fields.Str(required=True)
 
+    class Meta:
+        unknown = EXCLUDE
 
-    
 
+def validate_json(schema_class, location="json"):
+    """Route decorator: load the request payload with schema_class and pass it to the view as data.
+
+    The schema is built once here, not on every request. location is "json" (the body), "args"
+    (the query string) or "both" (query string over body). data is the payload with the
+    schema's fields loaded (typed and normalised) over the raw values, so keys the schema does
+    not list, like user_id, reach the sql.py helpers as sent.
+    """
+    schema = schema_class()
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            raw = {}
+            if location in ("json", "both"):
+                raw = request.get_json(silent=True)
+                if not isinstance(raw, dict):
+                    return jsonify({"errors": {"_schema": ["Expected a JSON object."]}}), 400
+            if location in ("args", "both"):
+                raw = {**raw, **request.args.to_dict()}
+            try:
+                loaded = schema.load(raw)
+            except ValidationError as e:
+                return jsonify({"errors": e.messages}), 400
+            return f(*args, data={**raw, **loaded}, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,209 @@
+# db.py
+# Engine factory: pool settings come from the environment, pool usage is recorded for /metrics.
+import os
+import threading
+import time
+
+from flask import g, has_request_context, current_app
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+def env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_bool(name, default):
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class PoolMetrics:
+    """Counters for pool checkouts; wait time is how long a caller blocked for a connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self, pool):
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                "pool_size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "checkout_wait_avg_ms": round(self.wait_total / waits * 1000, 3) if waits else 0,
+                "checkout_wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that times every checkout, including the wait for a free connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return conn
+
+
+def make_engine():
+    """Build the application engine from DATABASE_URL and the DB_* pool settings."""
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL is not set")
+    engine = create_engine(
+        url,
+        poolclass=MeteredQueuePool,
+        pool_size=env_int("DB_POOL_SIZE", 5),
+        max_overflow=env_int("DB_MAX_OVERFLOW", 10),
+        pool_timeout=env_int("DB_POOL_TIMEOUT", 30),
+        # Neon closes idle server connections, so recycle ours before that happens
+        pool_recycle=env_int("DB_POOL_RECYCLE", 300),
+        pool_pre_ping=env_bool("DB_POOL_PRE_PING", True),
+        echo=env_bool("DB_ECHO", False),
+    )
+
+    # Set per transaction with SET LOCAL: the Neon pooler runs PgBouncer in transaction mode, so
+    # a session-level SET (or the startup "options" parameter, which it does not pass on) would
+    # not stay with the server connection our next transaction lands on.
+    statement_timeout = env_int("DB_STATEMENT_TIMEOUT_MS", 0)
+    if statement_timeout > 0:
+        @event.listens_for(engine, "begin")
+        def set_statement_timeout(conn):
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {statement_timeout}")
+
+    return engine
+
+
+engine = make_engine()
+
+
+def pool_status():
+    return pool_metrics.snapshot(engine.pool)
+
+
+# Request-scoped unit of work: inside a request every helper shares one connection and one
+# transaction, committed once when the response succeeds and rolled back otherwise.
+
+class RequestConnection:
+    """Proxy for the request's connection; commit, close and begin are deferred to the request."""
+
+    def __init__(self, conn):
+        self.connection = conn
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+    def begin(self):
+        # `with conn.begin():` joins the request transaction
+        return self
+
+
+def _request_scoped():
+    return has_request_context() and current_app.extensions.get("db_unit_of_work", False)
+
+
+def _request_connection():
+    conn = g.get("db_conn")
+    if conn is None:
+        conn = g.db_conn = RequestConnection(engine.connect())
+    return conn
+
+
+def db_connect():
+    """Connection for a helper: the request's shared one, or a fresh pooled one outside a request."""
+    if _request_scoped():
+        return _request_connection()
+    return engine.connect()
+
+
+def db_begin():
+    """Like engine.begin(), but joins the request transaction when there is one."""
+    if _request_scoped():
+        return _request_connection()
+    return engine.begin()
+
+
+def after_commit(callback):
+    """Run callback once the request transaction commits; outside a request, run it now.
+
+    Helpers call this after their own commit(), so outside a request the data is already written.
+    """
+    if _request_scoped():
+        g.setdefault("db_after_commit", []).append(callback)
+    else:
+        callback()
+
+
+def init_app(app):
+    """Enable the request-scoped unit of work for app."""
+    app.extensions["db_unit_of_work"] = True
+
+    @app.after_request
+    def finish_unit_of_work(response):
+        conn = g.pop("db_conn", None)
+        callbacks = g.pop("db_after_commit", [])
+        committed = response.status_code < 400
+        if conn is not None:
+            try:
+                if committed:
+                    conn.connection.commit()
+                else:
+                    conn.connection.rollback()
+            finally:
+                conn.connection.close()
+        if committed:
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"after_commit callback failed: {e}")
+        return response
+
+    @app.teardown_request
+    def release_unit_of_work(exc):
+        # Only reached with a live connection when the view raised before after_request ran
+        conn = g.pop("db_conn", None)
+        if conn is not None:
+            try:
+                conn.connection.rollback()
+            finally:
+                conn.connection.close()
@@ -0,0 +1,157 @@
+# http_cache.py
+# Conditional GETs and response compression for the read endpoints.
+#
+# The project views (/project/view_details, view_sprints, view_tasks, analytics) take their
+# ETag from project_version, a counter the database bumps on every write to the project's
+# rows (migration 9). @project_conditional reads that counter first and answers a matching
+# If-None-Match with 304 before the view runs its queries. Other GETs can use Flask's
+# add_etag(), a hash of the body, as /best_projects does.
+#
+# init_app() compresses larger JSON bodies with brotli or gzip and turns 200s whose ETag the
+# client already has into 304s. A compressed body gets its own ETag ("<etag>-br"), as a strong
+# validator has to change with the bytes; either form matches on the way back in.
+import gzip
+import hashlib
+import os
+from datetime import date
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+import queries
+from db import db_connect
+from throttle import Counters
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+COMPRESSIBLE = {"application/json", "text/plain", "text/html", "text/csv"}
+ENCODINGS = ["br", "gzip"] if brotli else ["gzip"]
+# Part of every project ETag; change it on deploys that change what these endpoints return
+ETAG_RELEASE = os.getenv("ETAG_RELEASE", "1")
+
+counters = Counters("conditional", "not_modified", "not_modified_early", "not_modified_bytes",
+                    "compressed", "bytes_before", "bytes_after")
+
+
+def stats():
+    values = counters.snapshot()
+    values["hit_rate"] = round(values["not_modified"] / values["conditional"], 4) if values["conditional"] else 0
+    values["bytes_saved"] = values["bytes_before"] - values["bytes_after"] + values["not_modified_bytes"]
+    return values
+
+
+def project_etag(project_id, daily=False):
+    """ETag for a project view: the endpoint, the project's version and, if daily, today's date."""
+    with db_connect() as conn:
+        version = conn.execute(queries.PROJECT_VERSION, {"project_id": project_id}).scalar()
+    key = f"{ETAG_RELEASE}:{request.path}:{project_id}:{version}"
+    if daily:
+        key += f":{date.today().isoformat()}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def client_tag(etag):
+    """The form of etag (plain or per encoding) named in If-None-Match, or None."""
+    for tag in [etag] + [f"{etag}-{e}" for e in ENCODINGS]:
+        if request.if_none_match.contains(tag):
+            return tag
+    return None
+
+
+def project_conditional(daily=False):
+    """Route decorator for GETs that show one project, given as ?project_id=.
+
+    daily is for views that also depend on the date (analytics counts days left).
+    The version is read before the view's queries, so a write in between leaves the ETag
+    older than the body and the next request refetches; it never marks a newer body as current.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            try:
+                project_id = int(request.args.get("project_id"))
+            except (TypeError, ValueError):
+                return f(*args, **kwargs)  # the view reports the bad parameter
+            try:
+                etag = project_etag(project_id, daily)
+            except Exception as e:
+                print(f"Error reading project version: {e}")
+                return f(*args, **kwargs)
+
+            cached = client_tag(etag)
+            if cached:
+                counters.add("not_modified_early")
+                response = current_app.response_class(status=304)
+                etag = cached
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            # cache, but check with us before every use
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+def compress(response):
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None or response.mimetype not in COMPRESSIBLE:
+        return response
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_BYTES:
+        return response
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=5)
+    else:
+        compressed = gzip.compress(body, compresslevel=6)
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    counters.add("compressed")
+    counters.add("bytes_before", len(body))
+    counters.add("bytes_after", len(compressed))
+    return response
+
+
+def init_app(app):
+    """Answer conditional GETs and compress responses for app."""
+
+    @app.after_request
+    def finish_response(response):
+        if request.method not in ("GET", "HEAD"):
+            return response
+        etag, _ = response.get_etag()
+        # hit rate is over requests that could have been answered with a 304: an If-None-Match
+        # sent to a response with a validator (early 304s from project_conditional included)
+        if request.if_none_match and etag:
+            counters.add("conditional")
+        if response.status_code in (200, 304):
+            response.vary.add("Accept-Encoding")
+        if response.status_code == 304:
+            counters.add("not_modified")
+            return response
+        if (response.status_code != 200 or response.direct_passthrough
+                or "Content-Encoding" in response.headers):
+            return response
+
+        cached = client_tag(etag) if etag else None
+        if cached:
+            # the view ran anyway (no version to check first), but the client has this body
+            counters.add("not_modified")
+            counters.add("not_modified_bytes", len(response.get_data()))
+            response.status_code = 304
+            response.set_data(b"")
+            response.set_etag(cached)
+            for header in ("Content-Type", "Content-Length"):
+                response.headers.pop(header, None)
+            return response
+
+        return compress(response)
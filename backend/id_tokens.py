@@ -0,0 +1,112 @@
+# id_tokens.py
+# Verifies Firebase ID tokens locally with PyJWT against Google's published signing
+# certificates, which are fetched once and cached for as long as their Cache-Control allows.
+import os
+import re
+import threading
+import time
+
+import firebase_admin
+import jwt
+import requests
+from cryptography import x509
+
+CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+# Firebase clients and this server disagree on the time by a second or two now and then
+MAX_CLOCK_SKEW = float(os.getenv("ID_TOKEN_MAX_CLOCK_SKEW_SECONDS", 5))
+SKEW_RETRIES = 3
+
+
+class SigningKeys:
+    """kid -> public key, refreshed when the certificates expire (or shortly before, in the background)."""
+
+    def __init__(self, url=CERTS_URL, refresh_ahead=300, min_refetch=30):
+        self.url = url
+        self.refresh_ahead = refresh_ahead
+        self.min_refetch = min_refetch
+        self._keys = {}
+        self._expires_at = 0
+        self._fetched_at = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self, kid):
+        now = time.time()
+        if now >= self._expires_at:
+            self.refresh()
+        elif now >= self._expires_at - self.refresh_ahead:
+            self._refresh_in_background()
+        key = self._keys.get(kid)
+        if key is None and time.time() - self._fetched_at > self.min_refetch:
+            # keys were rotated since the last fetch
+            self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+    def refresh(self):
+        fetched_at = self._fetched_at
+        with self._lock:
+            if self._fetched_at != fetched_at:
+                # another thread fetched the keys while this one waited for the lock
+                return
+            response = requests.get(self.url, timeout=10)
+            response.raise_for_status()
+            self._keys = {
+                kid: x509.load_pem_x509_certificate(pem.encode()).public_key()
+                for kid, pem in response.json().items()
+            }
+            match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+            self._fetched_at = time.time()
+            self._expires_at = self._fetched_at + (int(match.group(1)) if match else 3600)
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing ID token keys: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="id-token-keys", daemon=True).start()
+
+
+signing_keys = SigningKeys()
+
+
+def project_id():
+    return os.getenv("FIREBASE_PROJECT_ID") or firebase_admin.get_app().project_id
+
+
+def verify_id_token(id_token):
+    """Decoded claims of a Firebase ID token, with "uid" set like firebase_admin's; raises jwt.InvalidTokenError."""
+    header = jwt.get_unverified_header(id_token)
+    key = signing_keys.get(header.get("kid"))
+    if key is None:
+        raise jwt.InvalidTokenError("Unknown signing key")
+
+    project = project_id()
+    for attempt in range(SKEW_RETRIES):
+        try:
+            claims = jwt.decode(
+                id_token, key, algorithms=["RS256"], audience=project,
+                issuer=f"https://securetoken.google.com/{project}",
+                options={"require": ["exp", "iat", "sub"]},
+            )
+            break
+        except jwt.ImmatureSignatureError:
+            # issued "in the future": wait for our clock to catch up, but not for long
+            ahead = jwt.decode(id_token, options={"verify_signature": False})["iat"] - time.time()
+            if attempt == SKEW_RETRIES - 1 or ahead > MAX_CLOCK_SKEW:
+                raise
+            time.sleep(min(max(ahead, 0.1), MAX_CLOCK_SKEW / SKEW_RETRIES))
+
+    if not claims["sub"] or claims.get("auth_time", 0) > time.time() + MAX_CLOCK_SKEW:
+        raise jwt.InvalidTokenError("Invalid subject or auth_time")
+    claims["uid"] = claims["sub"]
+    return claims
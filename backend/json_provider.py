@@ -0,0 +1,43 @@
+# json_provider.py
+# orjson as the app's JSON provider. orjson writes dicts, lists, dates, datetimes and UUIDs
+# itself; default() covers the rest of what our queries return: Decimals (SUM/AVG results)
+# and SQLAlchemy rows, which can be handed to jsonify() without copying them into dicts.
+#
+# Dates come out as ISO 8601 ("2025-01-31") rather than Flask's HTTP date format.
+import decimal
+
+import orjson
+from flask.json.provider import JSONProvider
+from sqlalchemy.engine import Row, RowMapping
+
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def default(obj):
+    if isinstance(obj, decimal.Decimal):
+        # SUM() over integer columns comes back as numeric; keep whole numbers as ints
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, RowMapping):
+        return dict(obj)
+    if isinstance(obj, Row):
+        return dict(obj._mapping)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    def options(self):
+        return OPTIONS | orjson.OPT_INDENT_2 if self._app.debug else OPTIONS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=default, option=self.options()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # straight to bytes, no str round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=default, option=self.options()),
+                                        mimetype="application/json")
@@ -0,0 +1,65 @@
+# leaderboard.py
+# Background refresh of the project_leaderboard materialised view behind /best_projects.
+import os
+import threading
+
+from sqlalchemy import text
+from db import engine
+
+# Arbitrary key so only one worker refreshes at a time
+REFRESH_LOCK_KEY = 7_100_001
+
+
+def refresh_leaderboard():
+    """Refresh the view without blocking readers. Returns False if another worker is already refreshing."""
+    with engine.begin() as conn:
+        locked = conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": REFRESH_LOCK_KEY}).scalar()
+        if not locked:
+            return False
+        conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY project_leaderboard"))
+    return True
+
+
+class LeaderboardRefresher:
+    """Refreshes on a fixed interval, and shortly after request_refresh() is called.
+
+    The delay after a request lets the rating's transaction commit first and folds a burst
+    of ratings into one refresh.
+    """
+
+    def __init__(self, interval, debounce):
+        self.interval = interval
+        self.debounce = debounce
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="leaderboard-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def request_refresh(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._wake.wait(self.interval):
+                self._stop.wait(self.debounce)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                refresh_leaderboard()
+            except Exception as e:
+                print(f"Error refreshing leaderboard: {e}")
+
+
+refresher = LeaderboardRefresher(
+    interval=int(os.getenv("LEADERBOARD_REFRESH_SECONDS", 300)),
+    debounce=float(os.getenv("LEADERBOARD_REFRESH_DEBOUNCE_SECONDS", 2)),
+)
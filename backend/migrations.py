@@ -0,0 +1,342 @@
+# migrations.py
+# Versioned schema changes, applied in order and recorded in schema_migrations.
+# Run with: flask --app app migrate
+from sqlalchemy import text
+from sql import engine, rebuild_task_rollups, backfill_notifications
+import queries
+
+
+# (version, name, steps) -- a step is either a SQL string or a callable taking the connection
+MIGRATIONS = [
+    (1, "project analytics rollups", [
+        """
+        CREATE TABLE IF NOT EXISTS sprint_rollup (
+            project_id INTEGER NOT NULL,
+            sprint_number INTEGER NOT NULL,
+            total_tasks INTEGER NOT NULL DEFAULT 0,
+            pending_tasks INTEGER NOT NULL DEFAULT 0,
+            review_tasks INTEGER NOT NULL DEFAULT 0,
+            done_tasks INTEGER NOT NULL DEFAULT 0,
+            planned_points INTEGER NOT NULL DEFAULT 0,
+            completed_points INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (project_id, sprint_number)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS assignee_rollup (
+            project_id INTEGER NOT NULL,
+            assigned_to TEXT NOT NULL,
+            total_tasks INTEGER NOT NULL DEFAULT 0,
+            done_tasks INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (project_id, assigned_to)
+        )
+        """,
+        rebuild_task_rollups,
+    ]),
+    # Unique indexes fail if duplicates already exist; remove them first and re-run.
+    (2, "hot query indexes", [
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_projectmembers_project_member ON projectmembers (project_id, member_id)",
+        "CREATE INDEX IF NOT EXISTS ix_projectmembers_member ON projectmembers (member_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_projectapplication_user_project ON projectapplication (user_id, project_id)",
+        "CREATE INDEX IF NOT EXISTS ix_projectapplication_project_status ON projectapplication (project_id, status)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_projectjoin_user_project ON projectjoin (user_id, project_id)",
+        "CREATE INDEX IF NOT EXISTS ix_projectjoin_user_status ON projectjoin (user_id, status)",
+        "CREATE INDEX IF NOT EXISTS ix_task_project_sprint_status ON task (project_id, sprint_number, status)",
+        "CREATE INDEX IF NOT EXISTS ix_sprint_project_sprint ON sprint (project_id, sprint_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_mentorrequest_project_mentor ON mentorrequest (project_id, mentor_id)",
+        "CREATE INDEX IF NOT EXISTS ix_projectrating_project ON projectrating (project_id)",
+    ]),
+    # Generated columns, so every write to "Project" (add_projects included) keeps them in sync
+    (3, "project search", [
+        r"""
+        ALTER TABLE "Project" ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(tags, '')), 'C')
+            ) STORED
+        """,
+        r"""
+        ALTER TABLE "Project" ADD COLUMN IF NOT EXISTS tag_list text[]
+            GENERATED ALWAYS AS (
+                array_remove(regexp_split_to_array(lower(btrim(coalesce(tags, ''))), '\s*,\s*'), '')
+            ) STORED
+        """,
+        'CREATE INDEX IF NOT EXISTS ix_project_search_vector ON "Project" USING GIN (search_vector)',
+        'CREATE INDEX IF NOT EXISTS ix_project_tag_list ON "Project" USING GIN (tag_list)',
+    ]),
+    # Leaderboard: 0.7 * average score + 0.3 * comments, each comment's weight halving every 90 days
+    (4, "project leaderboard", [
+        "ALTER TABLE projectrating ADD COLUMN IF NOT EXISTS created_at TIMESTAMP NOT NULL DEFAULT now()",
+        """
+        CREATE MATERIALIZED VIEW IF NOT EXISTS project_leaderboard AS
+        SELECT
+            p.project_id,
+            p.title,
+            AVG(r.score)::float8 * 0.7 + 0.3 * COALESCE(SUM(
+                power(0.5, extract(epoch FROM now() - r.created_at) / (90 * 86400))
+            ) FILTER (WHERE NULLIF(btrim(r.comment), '') IS NOT NULL), 0) AS score,
+            COUNT(*) AS ratings
+        FROM projectrating r
+        JOIN "Project" p ON r.project_id = p.project_id
+        GROUP BY p.project_id, p.title
+        """,
+        # REFRESH ... CONCURRENTLY needs a unique index
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_project_leaderboard_project ON project_leaderboard (project_id)",
+        "CREATE INDEX IF NOT EXISTS ix_project_leaderboard_score ON project_leaderboard (score DESC, project_id)",
+    ]),
+    # Notification inbox replacing the notifications /notification derived from the application tables
+    (5, "notification inbox", [
+        """
+        CREATE TABLE IF NOT EXISTS notification (
+            id BIGSERIAL PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            ref_id BIGINT,
+            payload JSONB NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT now(),
+            read_at TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS notification_unread (
+            user_id TEXT PRIMARY KEY,
+            unread INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_notification_user_created ON notification (user_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_notification_kind_ref ON notification (kind, ref_id)",
+        backfill_notifications,
+    ]),
+    (6, "chat history index", [
+        "CREATE INDEX IF NOT EXISTS ix_messages_usergroup_id ON messages (usergroup, id)",
+    ]),
+    # Login sessions for /auto_login; rows from before this live in Firestore and move over on first use
+    (7, "user sessions", [
+        """
+        CREATE TABLE IF NOT EXISTS user_session (
+            uid TEXT NOT NULL,
+            fingerprint TEXT NOT NULL DEFAULT '',
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            expires_at TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (uid, fingerprint)
+        )
+        """,
+    ]),
+    # Revoked session tokens (see session_tokens.py), kept until the token would have expired
+    (8, "session token revocations", [
+        """
+        CREATE TABLE IF NOT EXISTS session_revocation (
+            jti TEXT PRIMARY KEY,
+            expires_at TIMESTAMPTZ NOT NULL
+        )
+        """,
+    ]),
+    # Per-project change counter behind the ETags of the project read endpoints (http_cache.py).
+    # Triggers rather than sql.py calls, so no write path can forget to bump it.
+    (9, "project versions", [
+        """
+        CREATE TABLE IF NOT EXISTS project_version (
+            project_id INTEGER PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 1
+        )
+        """,
+        """
+        CREATE OR REPLACE FUNCTION bump_project_version(pid INTEGER) RETURNS void AS $$
+            INSERT INTO project_version (project_id) VALUES (pid)
+            ON CONFLICT (project_id) DO UPDATE SET version = project_version.version + 1
+        $$ LANGUAGE sql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION project_row_changed() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                PERFORM bump_project_version(OLD.project_id);
+            END IF;
+            IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.project_id IS DISTINCT FROM OLD.project_id) THEN
+                PERFORM bump_project_version(NEW.project_id);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        # names show up on the task board, analytics and project details
+        """
+        CREATE OR REPLACE FUNCTION user_name_changed() RETURNS trigger AS $$
+        BEGIN
+            PERFORM bump_project_version(project_id) FROM (
+                SELECT project_id FROM projectmembers WHERE member_id = NEW.roll_no
+                UNION
+                SELECT project_id FROM task WHERE assigned_to::TEXT = NEW.roll_no
+            ) affected;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        'DROP TRIGGER IF EXISTS project_version_bump ON "Project"',
+        'CREATE TRIGGER project_version_bump AFTER INSERT OR UPDATE OR DELETE ON "Project" FOR EACH ROW EXECUTE FUNCTION project_row_changed()',
+        "DROP TRIGGER IF EXISTS project_version_bump ON task",
+        "CREATE TRIGGER project_version_bump AFTER INSERT OR UPDATE OR DELETE ON task FOR EACH ROW EXECUTE FUNCTION project_row_changed()",
+        "DROP TRIGGER IF EXISTS project_version_bump ON sprint",
+        "CREATE TRIGGER project_version_bump AFTER INSERT OR UPDATE OR DELETE ON sprint FOR EACH ROW EXECUTE FUNCTION project_row_changed()",
+        "DROP TRIGGER IF EXISTS project_version_bump ON projectmembers",
+        "CREATE TRIGGER project_version_bump AFTER INSERT OR UPDATE OR DELETE ON projectmembers FOR EACH ROW EXECUTE FUNCTION project_row_changed()",
+        "DROP TRIGGER IF EXISTS project_version_bump ON sprint_rollup",
+        "CREATE TRIGGER project_version_bump AFTER INSERT OR UPDATE OR DELETE ON sprint_rollup FOR EACH ROW EXECUTE FUNCTION project_row_changed()",
+        "DROP TRIGGER IF EXISTS project_version_bump ON assignee_rollup",
+        "CREATE TRIGGER project_version_bump AFTER INSERT OR UPDATE OR DELETE ON assignee_rollup FOR EACH ROW EXECUTE FUNCTION project_row_changed()",
+        'DROP TRIGGER IF EXISTS project_version_bump ON "User"',
+        'CREATE TRIGGER project_version_bump AFTER UPDATE OF name ON "User" FOR EACH ROW WHEN (NEW.name IS DISTINCT FROM OLD.name) EXECUTE FUNCTION user_name_changed()',
+    ]),
+]
+
+
+# (table, index, statement, params) -- the index each hot query should be planned on
+HOT_QUERIES = [
+    ("projectmembers", "ux_projectmembers_project_member", queries.MEMBER_ROLE.text,
+     {"project_id": 1, "user_id": "x"}),
+    ("projectmembers", "ix_projectmembers_member", """
+        SELECT p.project_id FROM "Project" p
+        JOIN projectmembers pm ON p.project_id = pm.project_id
+        WHERE pm.member_id = :user_id
+    """, {"user_id": "x"}),
+    ("projectapplication", "ux_projectapplication_user_project", """
+        SELECT * FROM projectapplication WHERE user_id = :user_id AND project_id = :project_id
+    """, {"user_id": "x", "project_id": 1}),
+    ("projectapplication", "ix_projectapplication_project_status", """
+        SELECT * FROM projectapplication WHERE project_id = :project_id AND status = 'Pending'
+    """, {"project_id": 1}),
+    ("projectjoin", "ix_projectjoin_user_status", """
+        SELECT * FROM projectjoin WHERE user_id = :user_id AND status = 'Pending'
+    """, {"user_id": "x"}),
+    ("task", "ix_task_project_sprint_status", queries.sprint_board(False).text, {"project_id": 1}),
+    ("sprint", "ix_sprint_project_sprint", queries.SPRINT_STATUS.text, {"project_id": 1, "sprint_number": 1}),
+    ("mentorrequest", "ux_mentorrequest_project_mentor", """
+        SELECT * FROM mentorrequest WHERE project_id = :project_id AND mentor_id = :mentor_id
+    """, {"project_id": 1, "mentor_id": "x"}),
+    ("notification", "ix_notification_user_created", queries.NOTIFICATION_PAGE.text,
+     {"user_id": "x", "before_at": None, "before_id": 0, "unread_only": False, "limit": 21,
+      "overlap": 30}),
+    ("messages", "ix_messages_usergroup_id", queries.CHAT_HISTORY.text,
+     {"usergroup": "general", "before": None, "limit": 51}),
+    ("projectrating", "ix_projectrating_project", """
+        SELECT AVG(score) FROM projectrating WHERE project_id = :project_id
+    """, {"project_id": 1}),
+]
+
+# rows added to each hot table for the check, so the planner costs the queries like it would in production
+SEED_ROWS = 5000
+
+# seed value per column type from the row number g and a per-column modulus m, so keys repeat like
+# project and member ids do while any two columns together stay unique; other types keep their default
+SEED_VALUES = {
+    "smallint": "CAST(g % {m} AS smallint)",
+    "integer": "g % {m}",
+    "bigint": "g % {m}",
+    "numeric": "g % 5 + 1",
+    "real": "g % 5 + 1",
+    "double precision": "g % 5 + 1",
+    "text": "'seed' || g % {m}",
+    "character varying": "'seed' || g % {m}",
+    "boolean": "false",
+    "date": "CURRENT_DATE",
+    "timestamp without time zone": "LOCALTIMESTAMP",
+    "timestamp with time zone": "CURRENT_TIMESTAMP",
+    "json": "'{{}}'",
+    "jsonb": "'{{}}'",
+}
+SEED_MODULI = [251, 241, 239, 233, 229, 227, 223, 211, 199, 197, 193, 191, 181, 179, 173, 167]
+
+
+def _seed_table(conn, table, rows):
+    """Insert `rows` generated rows into table and ANALYZE it. False if the table's constraints refuse them."""
+    columns = conn.execute(text("""
+        SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = :table
+          AND column_default IS NULL AND is_generated = 'NEVER' AND is_identity = 'NO'
+        ORDER BY ordinal_position
+    """), {"table": table}).all()
+    values = [(name, SEED_VALUES[kind].format(m=SEED_MODULI[i % len(SEED_MODULI)]))
+              for i, (name, kind) in enumerate(columns) if kind in SEED_VALUES]
+    if not values:
+        return False
+    savepoint = conn.begin_nested()
+    try:
+        conn.execute(text(f"""
+            INSERT INTO "{table}" ({", ".join(f'"{name}"' for name, _ in values)})
+            SELECT {", ".join(value for _, value in values)} FROM generate_series(1, :rows) g
+        """), {"rows": rows})
+        conn.execute(text(f'ANALYZE "{table}"'))
+    except Exception as e:
+        print(f"Could not seed {table}: {str(e).splitlines()[0]}")
+        savepoint.rollback()
+        return False
+    savepoint.commit()
+    return True
+
+
+def _index_names(plan):
+    if "Index Name" in plan:
+        yield plan["Index Name"]
+    for child in plan.get("Plans", []):
+        yield from _index_names(child)
+
+
+def check_query_plans(seed_rows=SEED_ROWS):
+    """EXPLAIN each hot query and return (table, index, statement, used) for those not planned on their index.
+
+    Each hot table gets seed_rows generated rows first, inside a transaction that is rolled back. A table
+    that cannot be seeded (a foreign key or check constraint refuses the rows) is checked with sequential
+    scans disabled instead, so that a small table does not hide a missing index.
+    """
+    failures = []
+    with engine.connect() as conn:
+        try:
+            # skip foreign key checks and triggers for the seed rows; needs a superuser, so optional
+            with conn.begin_nested():
+                conn.execute(text("SET LOCAL session_replication_role = replica"))
+        except Exception as e:
+            print(f"Seeding with foreign key checks on: {str(e).splitlines()[0]}")
+        seeded = {table for table in dict.fromkeys(t for t, _, _, _ in HOT_QUERIES)
+                  if _seed_table(conn, table, seed_rows)}
+        for table, index, statement, params in HOT_QUERIES:
+            conn.execute(text(f"SET LOCAL enable_seqscan = {'on' if table in seeded else 'off'}"))
+            plan = conn.execute(text("EXPLAIN (FORMAT JSON) " + statement), params).scalar()
+            used = list(_index_names(plan[0]["Plan"]))
+            if index not in used:
+                failures.append((table, index, " ".join(statement.split()), ", ".join(used) or "no index"))
+        conn.rollback()
+    return failures
+
+
+def applied_versions(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def migrate():
+    """Apply every pending migration, each in its own transaction. Returns the versions applied."""
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+
+    applied = []
+    for version, name, steps in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(text(step))
+            conn.execute(text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                         {"version": version, "name": name})
+        print(f"Applied migration {version}: {name}")
+        applied.append(version)
+    return applied
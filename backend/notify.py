@@ -0,0 +1,38 @@
+# notify.py
+# Publishes notification events to per-user Socket.IO rooms on the chat server (sender.py).
+# app.py and sender.py run as separate processes, so events travel over the Socket.IO message
+# queue; without SOCKETIO_MESSAGE_QUEUE push is off and clients catch up through /notification.
+import os
+
+from flask_socketio import SocketIO
+from db import after_commit
+from presence import make_client_manager
+
+MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE")
+
+def make_emitter(url):
+    """Write-only SocketIO for url. message_queue makes Flask-SocketIO set up its server without an app."""
+    if not url:
+        return None
+    return SocketIO(message_queue=url, client_manager=make_client_manager(url, write_only=True))
+
+
+_emitter = make_emitter(MESSAGE_QUEUE)
+
+
+def user_room(user_id):
+    return f"user:{user_id}"
+
+
+def publish(user_id, payload):
+    if _emitter is None or not user_id:
+        return
+    try:
+        _emitter.emit("notification", payload, to=user_room(user_id))
+    except Exception as e:
+        print(f"Error publishing notification: {e}")
+
+
+def notify_user(user_id, payload):
+    """Push payload to user_id once the current transaction has committed."""
+    after_commit(lambda: publish(user_id, payload))
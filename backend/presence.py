@@ -0,0 +1,115 @@
+# presence.py
+# Multi-worker support for the chat server (sender.py): the Socket.IO client manager that fans
+# room emits out to every worker, and a connected-client count across all of them.
+# Each worker keeps its own count in Redis under a key with a TTL that its heartbeat refreshes,
+# so a worker that dies stops being counted once the TTL runs out.
+import os
+import socket
+import threading
+import uuid
+
+PRESENCE_TTL = int(os.getenv("PRESENCE_TTL_SECONDS", 30))
+WORKERS_KEY = "chat:presence:workers"
+
+
+class LocalPresence:
+    """Single-process presence, used when there is no message queue."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count = 0
+
+    def connected(self):
+        with self._lock:
+            self._count += 1
+
+    def disconnected(self):
+        with self._lock:
+            self._count = max(self._count - 1, 0)
+
+    def heartbeat(self):
+        pass
+
+    def count(self):
+        return self._count
+
+
+class RedisPresence:
+    """Cluster-wide presence: one counter per worker, summed on read."""
+
+    def __init__(self, client, ttl=PRESENCE_TTL):
+        self.client = client
+        self.ttl = ttl
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.key = f"chat:presence:{self.worker_id}"
+        self._local = LocalPresence()
+
+    def connected(self):
+        self._local.connected()
+        self._write()
+
+    def disconnected(self):
+        self._local.disconnected()
+        self._write()
+
+    def heartbeat(self):
+        self._write()
+
+    def _write(self):
+        # SET with the local count rather than INCR, so a lost update is corrected by the next heartbeat
+        pipe = self.client.pipeline()
+        pipe.set(self.key, self._local.count(), ex=self.ttl)
+        pipe.sadd(WORKERS_KEY, self.worker_id)
+        pipe.execute()
+
+    def count(self):
+        workers = sorted(w.decode() if isinstance(w, bytes) else w for w in self.client.smembers(WORKERS_KEY))
+        if not workers:
+            return 0
+        counts = self.client.mget([f"chat:presence:{w}" for w in workers])
+        gone = [w for w, c in zip(workers, counts) if c is None]
+        if gone:
+            self.client.srem(WORKERS_KEY, *gone)
+        return sum(int(c) for c in counts if c is not None)
+
+
+_fake_server = None
+
+def redis_client(url):
+    """Redis client for url; fakeredis:// gives an in-process stand-in for local runs."""
+    global _fake_server
+    if url.startswith("fakeredis://"):
+        import fakeredis
+        if _fake_server is None:
+            _fake_server = fakeredis.FakeServer()
+        return fakeredis.FakeRedis(server=_fake_server)
+    import redis
+    return redis.Redis.from_url(url)
+
+
+def make_client_manager(url, write_only=False):
+    """Socket.IO client manager for url, or None to keep the default in-memory one.
+
+    redis:// uses Redis pub/sub, fakeredis:// the same over an in-process server (several
+    SocketIO instances in one process, e.g. a local test), anything else goes to kombu.
+    write_only is for processes that only emit, like app.py.
+    """
+    if not url:
+        return None
+    import socketio
+    if url.startswith("fakeredis://"):
+        class FakeRedisManager(socketio.RedisManager):
+            def _redis_connect(self):
+                self.redis = redis_client(self.redis_url)
+                self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        return FakeRedisManager(url, write_only=write_only)
+    if url.startswith(("redis://", "rediss://")):
+        return socketio.RedisManager(url, write_only=write_only)
+    return socketio.KombuManager(url, write_only=write_only)
+
+
+def make_presence(url=None):
+    url = url or os.getenv("PRESENCE_REDIS_URL") or os.getenv("SOCKETIO_MESSAGE_QUEUE")
+    if url and url.startswith(("redis://", "rediss://", "fakeredis://")):
+        return RedisPresence(redis_client(url))
+    return LocalPresence()
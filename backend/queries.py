@@ -0,0 +1,276 @@
+# queries.py
+# Statements for the hot paths, built once at import instead of on every call.
+# Server-side PREPARE is not used: psycopg2 has no protocol-level prepared statements and
+# the Neon pooler runs in transaction mode, where named prepared statements are not reliable.
+from functools import lru_cache
+
+from sqlalchemy import text
+
+
+# Membership checks (/verify/member, ratings, sprint creation, moderator changes)
+MEMBER_ROLE = text("""
+    SELECT role FROM projectmembers
+    WHERE project_id = :project_id AND member_id = :user_id
+""")
+
+MEMBER_EXISTS = text("""
+    SELECT 1 FROM projectmembers
+    WHERE project_id = :project_id AND member_id = :user_id
+""")
+
+
+# Sprints
+SPRINT_STATUS = text("""
+    SELECT status FROM sprint 
+    WHERE project_id = :project_id AND sprint_id = :sprint_number
+""")
+
+LAST_SPRINT_STATUS = text("""
+    SELECT status FROM sprint
+    WHERE project_id = :project_id
+    ORDER BY sprint_id DESC LIMIT 1
+""")
+
+PROJECT_SPRINTS = text("""
+    SELECT sprint_id, name, start_date, end_date
+    FROM sprint
+    WHERE project_id = :project_id
+    ORDER BY sprint_id
+""")
+
+
+# Tasks
+TASK_INSERT = text("""
+    INSERT INTO task (project_id, sprint_number, description, assigned_to, status, points)
+    VALUES (:project_id, :sprint_number, :description, :assigned_to, 'pending', :points)
+    RETURNING project_id, sprint_number, assigned_to, points, status
+""")
+
+TASK_COUNT = text("""
+    SELECT COUNT(*) FROM task WHERE id = :task_id
+""")
+
+TASK_FOR_UPDATE = text("""
+    SELECT project_id, sprint_number, assigned_to, points, status
+    FROM task WHERE id = :task_id
+    FOR UPDATE
+""")
+
+
+# Analytics and rollups
+PROJECT_SUMMARY = text("""
+    SELECT p.start_date, p.end_date,
+        (SELECT COUNT(*) FROM projectmembers pm WHERE pm.project_id = p.project_id) AS team_count
+    FROM "Project" p
+    WHERE p.project_id = :project_id
+""")
+
+SPRINT_ROLLUP_STATS = text("""
+    SELECT NULLIF(sprint_number, 0) AS sprint_number, total_tasks, done_tasks,
+        planned_points, completed_points
+    FROM sprint_rollup
+    WHERE project_id = :project_id AND total_tasks > 0
+""")
+
+ASSIGNEE_ROLLUP_STATS = text("""
+    SELECT NULLIF(r.assigned_to, '') AS assigned_to, u.roll_no, u.name,
+        r.total_tasks, r.done_tasks
+    FROM assignee_rollup r
+    LEFT JOIN "User" u ON u.roll_no = r.assigned_to
+    WHERE r.project_id = :project_id AND r.total_tasks > 0
+""")
+
+SPRINT_ROLLUP_UPSERT = text("""
+    INSERT INTO sprint_rollup (project_id, sprint_number, total_tasks, pending_tasks, review_tasks,
+                               done_tasks, planned_points, completed_points)
+    VALUES (:project_id, :sprint_number, :total, :pending, :review, :done, :planned, :completed)
+    ON CONFLICT (project_id, sprint_number) DO UPDATE SET
+        total_tasks = sprint_rollup.total_tasks + EXCLUDED.total_tasks,
+        pending_tasks = sprint_rollup.pending_tasks + EXCLUDED.pending_tasks,
+        review_tasks = sprint_rollup.review_tasks + EXCLUDED.review_tasks,
+        done_tasks = sprint_rollup.done_tasks + EXCLUDED.done_tasks,
+        planned_points = sprint_rollup.planned_points + EXCLUDED.planned_points,
+        completed_points = sprint_rollup.completed_points + EXCLUDED.completed_points
+""")
+
+ASSIGNEE_ROLLUP_UPSERT = text("""
+    INSERT INTO assignee_rollup (project_id, assigned_to, total_tasks, done_tasks)
+    VALUES (:project_id, :assigned_to, :total, :done)
+    ON CONFLICT (project_id, assigned_to) DO UPDATE SET
+        total_tasks = assignee_rollup.total_tasks + EXCLUDED.total_tasks,
+        done_tasks = assignee_rollup.done_tasks + EXCLUDED.done_tasks
+""")
+
+
+
+# Notification inbox (/notification). Every read is a range scan of ix_notification_user_created.
+NOTIFICATION_INSERT = text("""
+    WITH note AS (
+        INSERT INTO notification (user_id, kind, ref_id, payload, created_at)
+        VALUES (:user_id, :kind, :ref_id, CAST(:payload AS jsonb),
+                COALESCE(CAST(:created_at AS timestamp), now()))
+        RETURNING id, user_id, kind, payload, created_at, read_at
+    ), counter AS (
+        INSERT INTO notification_unread (user_id, unread)
+        SELECT user_id, 1 FROM note
+        ON CONFLICT (user_id) DO UPDATE SET unread = notification_unread.unread + 1
+    )
+    SELECT id, kind, payload, created_at, read_at FROM note
+""")
+
+# Newest first; before_at/before_id is the last row of the previous page
+NOTIFICATION_PAGE = text("""
+    SELECT id, kind, payload, created_at, read_at,
+           LOCALTIMESTAMP - make_interval(secs => CAST(:overlap AS double precision)) AS settled_before
+    FROM notification
+    WHERE user_id = :user_id
+      AND (CAST(:before_at AS timestamp) IS NULL
+           OR (created_at, id) < (CAST(:before_at AS timestamp), :before_id))
+      AND (NOT :unread_only OR read_at IS NULL)
+    ORDER BY created_at DESC, id DESC
+    LIMIT :limit
+""")
+
+# Oldest first, so the last row returned is where the next call picks up.
+# created_at is the inserting transaction's start time, so a row can commit after newer ones
+# have been read; settled_before (both queries) is the point before which we take every row
+# to have committed.
+NOTIFICATION_SINCE = text("""
+    SELECT id, kind, payload, created_at, read_at,
+           LOCALTIMESTAMP - make_interval(secs => CAST(:overlap AS double precision)) AS settled_before
+    FROM notification
+    WHERE user_id = :user_id
+      AND (created_at, id) > (CAST(:since_at AS timestamp), :since_id)
+      AND (NOT :unread_only OR read_at IS NULL)
+    ORDER BY created_at, id
+    LIMIT :limit
+""")
+
+NOTIFICATION_UNREAD = text("""
+    SELECT unread FROM notification_unread WHERE user_id = :user_id
+""")
+
+NOTIFICATION_MARK_READ = text("""
+    WITH marked AS (
+        UPDATE notification SET read_at = now()
+        WHERE user_id = :user_id AND read_at IS NULL
+          AND (:all OR id = ANY(:ids))
+        RETURNING id
+    )
+    UPDATE notification_unread
+    SET unread = GREATEST(unread - (SELECT COUNT(*) FROM marked), 0)
+    WHERE user_id = :user_id
+    RETURNING unread
+""")
+
+# An application or invite was decided or withdrawn: record the outcome on the notifications
+# that announced it and mark them read. The self-join exposes read_at from before the update.
+NOTIFICATION_RESOLVE = text("""
+    WITH resolved AS (
+        UPDATE notification n
+        SET payload = n.payload || jsonb_build_object('status', CAST(:status AS text)),
+            read_at = COALESCE(n.read_at, now())
+        FROM notification old
+        WHERE old.id = n.id AND n.kind = :kind AND n.ref_id = :ref_id
+        RETURNING n.user_id, old.read_at IS NULL AS was_unread
+    )
+    UPDATE notification_unread u
+    SET unread = GREATEST(u.unread - c.unread, 0)
+    FROM (
+        SELECT user_id, COUNT(*) FILTER (WHERE was_unread) AS unread
+        FROM resolved GROUP BY user_id
+    ) c
+    WHERE u.user_id = c.user_id
+""")
+
+
+# Chat: one INSERT for a whole batch, whatever its size
+MESSAGE_INSERT_BATCH = text("""
+    INSERT INTO messages (username, usergroup, message, type, file_name)
+    SELECT * FROM unnest(
+        CAST(:usernames AS text[]), CAST(:usergroups AS text[]), CAST(:messages AS text[]),
+        CAST(:types AS text[]), CAST(:file_names AS text[])
+    )
+""")
+
+# Newest first, stopping before the last page's oldest id (ix_messages_usergroup_id)
+CHAT_HISTORY = text("""
+    SELECT id, username, usergroup, message, type, file_name
+    FROM messages
+    WHERE usergroup = :usergroup
+      AND (CAST(:before AS bigint) IS NULL OR id < :before)
+    ORDER BY id DESC
+    LIMIT :limit
+""")
+
+
+USER_ROLE = text("""
+    SELECT role_type FROM "User" WHERE roll_no = :roll_no
+""")
+
+# Login sessions (/auto_login), one row per (uid, fingerprint)
+SESSION_UPSERT = text("""
+    WITH purged AS (
+        -- other expired sessions of this uid; this one is renewed below
+        DELETE FROM user_session WHERE uid = :uid AND fingerprint <> :fingerprint AND expires_at <= now()
+    )
+    INSERT INTO user_session (uid, fingerprint, expires_at)
+    VALUES (:uid, :fingerprint, now() + make_interval(secs => :max_age))
+    ON CONFLICT (uid, fingerprint) DO UPDATE SET expires_at = EXCLUDED.expires_at
+    RETURNING expires_at
+""")
+
+SESSION_GET = text("""
+    SELECT expires_at FROM user_session
+    WHERE uid = :uid AND fingerprint = :fingerprint AND expires_at > now()
+""")
+
+# Older clients send no fingerprint; any live session for the uid will do
+SESSION_GET_ANY = text("""
+    SELECT expires_at FROM user_session
+    WHERE uid = :uid AND expires_at > now()
+    ORDER BY expires_at DESC LIMIT 1
+""")
+
+SESSION_DELETE = text("""
+    DELETE FROM user_session WHERE uid = :uid AND fingerprint = :fingerprint
+""")
+
+# Bumped by triggers on every write to a project's rows (migration 9); 0 if never written since
+PROJECT_VERSION = text("""
+    SELECT COALESCE((SELECT version FROM project_version WHERE project_id = :project_id), 0)
+""")
+
+@lru_cache(maxsize=2)
+def sprint_board(with_title):
+    """Board query for get_sprint_tasks; with_title adds the optional task.title column."""
+    return text(f"""
+        SELECT
+            t.id, t.sprint_number, t.description, t.assigned_to, t.points, t.status,
+            u.roll_no AS assignee_roll_no, u.name AS assignee_name
+            {', t.title' if with_title else ''},
+            COUNT(t.id) OVER (PARTITION BY t.sprint_number) AS total_tasks,
+            COUNT(t.id) FILTER (WHERE t.status = 'done') OVER (PARTITION BY t.sprint_number) AS completed_tasks
+        FROM "Project" p
+        LEFT JOIN task t ON t.project_id = p.project_id
+        LEFT JOIN "User" u ON u.roll_no = t.assigned_to::TEXT
+        WHERE p.project_id = :project_id
+        ORDER BY t.sprint_number NULLS LAST, t.status
+    """)
+
+
+TASK_UPDATABLE_COLUMNS = {"description", "assigned_to", "status", "points", "sprint_number", "title"}
+
+@lru_cache(maxsize=64)
+def update_task(columns):
+    """UPDATE for one set of task columns; columns is a sorted tuple so each set compiles once."""
+    unknown = set(columns) - TASK_UPDATABLE_COLUMNS
+    if unknown:
+        raise ValueError(f"Cannot update task columns: {', '.join(sorted(unknown))}")
+    set_clause = ", ".join(f"{column} = :{column}" for column in columns)
+    return text(f"""
+        UPDATE task
+        SET {set_clause}
+        WHERE id = :task_id
+        RETURNING project_id, sprint_number, assigned_to, points, status
+    """)
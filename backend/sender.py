@@ -1,9 +1,27 @@
+import eventlet
+# redis-py sockets must be green for the message queue listener
+eventlet.monkey_patch()
+# and psycopg2 must yield to the hub while it waits on the database
+from psycogreen.eventlet import patch_psycopg
+patch_psycopg()
+
 from flask import Flask, request, jsonify
-from flask_socketio import SocketIO, emit, send,join_room, leave_room
+from flask_socketio import SocketIO, emit, send,join_room, leave_room, rooms
 from flask_cors import CORS
 import random
 import os
-from sql import insert_message
+import functools
+import queue
+from chat_store import make_writer
+from sql import chat_history_sql, chat_room, is_valid_member, GENERAL_ROOM
+from data_valid import chat_history_schema
+from notify import user_room
+from presence import make_client_manager, make_presence
+from throttle import RateLimiter, TypingCoalescer, counters
+import attachments
+from auth import verified_session
+import session_tokens
+import jwt
 
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
@@ -11,61 +29,236 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = 'secret!'
 CORS(app)
 
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode="eventlet")
+# With a message queue, emits to a room reach its members on every worker, so any number of
+# workers can run behind a load balancer. Long-polling still needs sticky sessions; set
+# SOCKETIO_TRANSPORTS=websocket to drop that requirement.
+MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE")
+TRANSPORTS = os.getenv("SOCKETIO_TRANSPORTS", "polling,websocket").split(",")
+HEARTBEAT_SECONDS = int(os.getenv("PRESENCE_HEARTBEAT_SECONDS", 10))
+EVENTS_PER_SECOND = float(os.getenv("SOCKET_EVENTS_PER_SECOND", 10))
+EVENT_BURST = int(os.getenv("SOCKET_EVENT_BURST", 20))
+TYPING_WINDOW_SECONDS = float(os.getenv("TYPING_WINDOW_SECONDS", 1))
+TYPING_EXPIRY_SECONDS = float(os.getenv("TYPING_EXPIRY_SECONDS", 5))
+# files go through /chat/attachments; messages carry text or an attachment_id
+MAX_MESSAGE_BYTES = int(os.getenv("CHAT_MAX_MESSAGE_BYTES", 8192))
+
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode="eventlet",
+                    client_manager=make_client_manager(MESSAGE_QUEUE),
+                    transports=TRANSPORTS)
+presence = make_presence()
+chat_writer = make_writer()
+chat_writer.start()
+
+def presence_heartbeat():
+    while True:
+        socketio.sleep(HEARTBEAT_SECONDS)
+        try:
+            presence.heartbeat()
+        except Exception as e:
+            print(f"presence heartbeat failed: {e}")
+
+socketio.start_background_task(presence_heartbeat)
+
+limiter = RateLimiter(EVENTS_PER_SECOND, EVENT_BURST)
+typing_state = TypingCoalescer(TYPING_WINDOW_SECONDS, TYPING_EXPIRY_SECONDS)
+history_schema = chat_history_schema()
+# sid -> roll_no of the user the connection authenticated as
+identities = {}
+
+def typing_sweeper():
+    # sends held-back typing changes and "stopped" for typists who went quiet
+    while True:
+        socketio.sleep(min(TYPING_WINDOW_SECONDS, 1))
+        for room, username, typing in typing_state.sweep():
+            socketio.emit("usertyping", {"username": username, "room": room, "typing": typing}, to=room)
+
+socketio.start_background_task(typing_sweeper)
+
+def rate_limited(handler):
+    """Drop the event when this connection has used up its token bucket."""
+    @functools.wraps(handler)
+    def wrapper(*args):
+        if not limiter.allow(request.sid):
+            return
+        return handler(*args)
+    return wrapper
+
+def authenticate(auth):
+    """roll_no for the connecting client, from its session token (auth={"token": ..} or the
+    session cookie) or, for older logins, the uid cookie; None if it is not logged in."""
+    token = (auth or {}).get("token") or request.cookies.get(session_tokens.COOKIE_NAME)
+    if token:
+        try:
+            return session_tokens.verify(token).get("roll_no")
+        except (session_tokens.UnknownKeyError, jwt.InvalidSignatureError):
+            pass  # another worker's key, try the uid cookie
+        except jwt.InvalidTokenError:
+            return None
+    uid = request.cookies.get("uid")
+    if not uid:
+        return None
+    try:
+        user = verified_session(uid, request.cookies.get("fingerprint"))
+    except Exception as e:
+        print(f"Error verifying socket session: {e}")
+        return None
+    return user["email"].split("@")[0] if user and user.get("email") else None
+
+def current_user():
+    return identities.get(request.sid)
 
 @socketio.on("connect")
-def handle_connect():
+def handle_connect(auth=None):
     print(request.sid)
     print("client has connected")
-    active_connections = len(socketio.server.manager.rooms['/'])
-    print(active_connections)
+    # anonymous clients can still read the general room; posting, typing, notifications and
+    # project rooms need a user
+    user_id = authenticate(auth)
+    if user_id:
+        identities[request.sid] = user_id
+    presence.connected()
     try:
 
      emit("connected", {"data": "connected"})
     except Exception as e:
         print(e)
 
+def joined_room(data):
+    """Room the event is for, if this socket has joined it; otherwise tell the client and return None."""
+    room = chat_room(data or {})
+    if room not in rooms():
+        emit("chat_error", {"error": "Join the room first", "room": room})
+        return None
+    return room
+
 @socketio.on("data")
+@rate_limited
 def handle_message(json):
-    emit("data", {'data': json, 'id': request.sid}, broadcast=True)
+    room = joined_room(json)
+    if room:
+        emit("data", {'data': json, 'id': request.sid}, to=room)
 
 @socketio.on("disconnect")
 def disconnected():
     """Event listener when client disconnects from the server"""
     print("user disconnected")
-    emit("disconnect", f"user {request.sid} disconnected", broadcast=True)
+    presence.disconnected()
+    limiter.forget(request.sid)
+    identities.pop(request.sid, None)
 
 @socketio.on("typing")
+@rate_limited
 def handle_event(data):
-    # Data manipulation goes here
-    print(data)
-    emit("usertyping", data,to="general", broadcast=True,include_self=False)
+    # {"typing": false} says stopped; only changes reach the room, at most one per window
+    room = joined_room(data)
+    username = current_user()
+    if not room or not username:
+        return
+    typing = data.get('typing', True) is not False
+    if typing_state.update(room, username, typing) is not None:
+        emit("usertyping", {**data, "username": username, "room": room, "typing": typing},
+             to=room, include_self=False)
 @socketio.on("chat_message")
+@rate_limited
 def handle_event(data):
     print("s",data)
-    # Data manipulation goes here
-    insert_message(data)
-    
-    emit("messages", data,to="general", broadcast=True)
+    room = joined_room(data)
+    if not room:
+        return
+    # sent as the user this connection logged in as, whatever the payload says
+    if not current_user():
+        emit("chat_error", {"error": "Log in to send messages"})
+        return
+    data['username'] = current_user()
+    if data.get('type') == 'file':
+        if not attachments.store.exists(data.get('attachment_id')):
+            emit("chat_error", {"error": "Upload the file to /chat/attachments first"})
+            return
+        # the stored message is the reference, never the file
+        data['message'] = data['attachment_id']
+    elif len((data.get('message') or '').encode()) > MAX_MESSAGE_BYTES:
+        emit("chat_error", {"error": "Message too large, send files as attachments"})
+        return
+    data['usergroup'] = room
+    # saved in the background; if the queue stays full, tell the sender instead of dropping it
+    try:
+        chat_writer.submit(data)
+    except queue.Full:
+        emit("chat_error", {"error": "Chat is busy, message not sent"})
+        return
+
+    emit("messages", data,to=room)
+
+@socketio.on("history")
+@rate_limited
+def on_history(data):
+    # same as GET /chat/history: {project_id, limit, cursor} -> {messages, next_cursor}
+    data = data or {}
+    errors = history_schema.validate(data)
+    if errors:
+        emit("history", {"errors": errors})
+        return
+    if not joined_room(data):
+        return
+    try:
+        emit("history", chat_history_sql(data))
+    except Exception as e:
+        emit("history", {"error": str(e)})
 
+@socketio.on("subscribe_notifications")
+@rate_limited
+def subscribe_notifications(data=None):
+    # app.py publishes notification events to this room when they are written; only ever the
+    # room of the user this connection logged in as
+    user_id = current_user()
+    if not user_id:
+        emit("subscribe_error", {"error": "Not logged in"})
+        return
+    join_room(user_room(user_id))
+    emit("subscribed", {"room": user_room(user_id)})
+
+# Rooms: one per project ({"project_id": ..}) for its members, plus the open "general" room.
+# Messages, typing and history go only to the room they were sent in.
 @socketio.on("join")
+@rate_limited
 def on_join(data):
-    username = data['username']
-    room = data['room']
+    username = current_user()
+    room = chat_room(data)
+    # membership of the user this connection logged in as, never a user_id from the payload
+    if room != GENERAL_ROOM and not (current_user() and is_valid_member(data['project_id'], current_user())):
+        emit("join_error", {"error": "Not a member of this project", "room": room})
+        return
     join_room(room)
-    a=1
-    a+=1
-    print(data,a)
-    active_connections = len(socketio.server.manager.rooms['/'])
-    print(active_connections)
-    emit('room_message', {'message': f'{username} has entered the room.'}, to=room)
+    # guests can read the general room, but are not announced
+    if username:
+        emit('room_message', {'message': f'{username} has entered the room.', 'room': room}, to=room)
 
 @socketio.on('leave')
+@rate_limited
 def on_leave(data):
-    username = data['username']
-    room = data['room']
+    username = current_user()
+    room = chat_room(data)
+    if room not in rooms():
+        return
     leave_room(room)
-    emit(username + ' has left the room.', to=room)
+    if username:
+        emit('room_message', {'message': f'{username} has left the room.', 'room': room}, to=room)
+
+
+@socketio.on("presence")
+@rate_limited
+def on_presence():
+    # clients connected to any worker
+    emit("presence", {"online": presence.count()})
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({
+        "chat_writer": chat_writer.stats(),
+        "online": presence.count(),
+        "events": counters.snapshot()
+    })
 
 
 
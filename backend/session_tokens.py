@@ -0,0 +1,116 @@
+# session_tokens.py
+# Signed session tokens issued at login: HS256 JWTs carrying uid, roll_no and role, verified
+# locally on every protected request.
+#
+# SESSION_SIGNING_KEYS is "kid:secret,kid:secret,...". The first key signs new tokens and all of
+# them verify, so a key is rotated by putting a new one first and dropping the old one once the
+# tokens it signed have expired (SESSION_MAX_AGE).
+import os
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import jwt
+from sqlalchemy import text
+
+from db import engine, db_connect
+from sessions import SESSION_MAX_AGE
+
+COOKIE_NAME = "session"
+
+
+class UnknownKeyError(jwt.InvalidTokenError):
+    """Token signed with a key this process does not have."""
+
+
+def load_keys():
+    value = os.getenv("SESSION_SIGNING_KEYS", "")
+    keys = [tuple(item.strip().split(":", 1)) for item in value.split(",") if ":" in item]
+    if not keys:
+        # every worker gets its own key, so tokens only verify on the worker that issued them;
+        # firebase_uid_required falls back to the uid cookie for the rest
+        print("Warning: SESSION_SIGNING_KEYS not set, session tokens are per process and do not survive a restart")
+        keys = [("dev", secrets.token_urlsafe(32))]
+    return keys
+
+
+SIGNING_KEYS = load_keys()
+ACTIVE_KID, ACTIVE_SECRET = SIGNING_KEYS[0]
+VERIFY_KEYS = dict(SIGNING_KEYS)
+
+
+def issue(uid, roll_no, role=None, max_age=SESSION_MAX_AGE):
+    now = int(time.time())
+    claims = {"sub": uid, "roll_no": roll_no, "role": role, "iat": now, "exp": now + max_age,
+              "jti": uuid.uuid4().hex}
+    return jwt.encode(claims, ACTIVE_SECRET, algorithm="HS256", headers={"kid": ACTIVE_KID})
+
+
+def verify(token):
+    """Claims of a valid, unrevoked session token, with "uid" set; raises jwt.InvalidTokenError."""
+    kid = jwt.get_unverified_header(token).get("kid")
+    secret = VERIFY_KEYS.get(kid)
+    if secret is None:
+        raise UnknownKeyError("Unknown session key")
+    claims = jwt.decode(token, secret, algorithms=["HS256"], options={"require": ["exp", "sub", "jti"]})
+    if revocations.is_revoked(claims["jti"]):
+        raise jwt.InvalidTokenError("Session revoked")
+    claims["uid"] = claims["sub"]
+    return claims
+
+
+class RevocationList:
+    """Revoked token ids until they expire: kept in memory, shared through session_revocation.
+
+    Each worker reloads the table every interval seconds, so a logout on one worker reaches the
+    others within that time.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def is_revoked(self, jti):
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def revoke(self, jti, exp):
+        with self._lock:
+            self._revoked[jti] = exp
+        with db_connect() as conn:
+            conn.execute(text("""
+                INSERT INTO session_revocation (jti, expires_at) VALUES (:jti, :expires_at)
+                ON CONFLICT (jti) DO NOTHING
+            """), {"jti": jti, "expires_at": datetime.fromtimestamp(exp, timezone.utc)})
+            conn.commit()
+
+    def sync(self):
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM session_revocation WHERE expires_at <= now()"))
+            rows = conn.execute(text("SELECT jti, expires_at FROM session_revocation")).fetchall()
+        revoked = {row.jti: row.expires_at.timestamp() for row in rows}
+        now = time.time()
+        with self._lock:
+            # keep local revocations the table has not caught up with
+            revoked.update((jti, exp) for jti, exp in self._revoked.items() if exp > now)
+            self._revoked = revoked
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="session-revocations", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Error loading session revocations: {e}")
+            time.sleep(self.interval)
+
+
+revocations = RevocationList(interval=int(os.getenv("SESSION_REVOCATION_SYNC_SECONDS", 30)))
@@ -0,0 +1,86 @@
+# sessions.py
+# Login sessions behind /auto_login: a point read on user_session (uid, fingerprint) with a
+# short per-process read-through cache in front. Sessions last as long as the login cookies.
+import os
+from datetime import datetime, timezone
+
+from cachetools import TTLCache
+
+from db import db_connect, after_commit
+import queries
+
+SESSION_MAX_AGE = 60 * 60 * 24 * 3  # same as the uid/fingerprint cookies
+
+# Only live sessions are cached: a miss must go to the database, since the login that creates
+# the session may have happened on another worker a moment ago.
+_cache = TTLCache(maxsize=int(os.getenv("SESSION_LOOKUP_CACHE_SIZE", 10000)),
+                  ttl=int(os.getenv("SESSION_LOOKUP_CACHE_SECONDS", 60)))
+
+
+# Uids the Firestore fallback in /auto_login turned away, so a bad cookie sent over and over
+# costs one Firestore query every few seconds rather than one per request.
+_rejected = TTLCache(maxsize=int(os.getenv("SESSION_LOOKUP_CACHE_SIZE", 10000)),
+                     ttl=int(os.getenv("LEGACY_SESSION_REJECT_SECONDS", 30)))
+
+
+def _key(uid, fingerprint):
+    return (uid, fingerprint or "")
+
+
+def save_session(uid, fingerprint, max_age=SESSION_MAX_AGE):
+    """Create or renew the session for this login."""
+    key = _key(uid, fingerprint)
+    _rejected.pop(key, None)
+    with db_connect() as conn:
+        expires_at = conn.execute(queries.SESSION_UPSERT, {
+            "uid": key[0], "fingerprint": key[1], "max_age": max_age
+        }).scalar()
+        conn.commit()
+    after_commit(lambda: _cache.__setitem__(key, expires_at))
+    return expires_at
+
+
+def session_valid(uid, fingerprint):
+    """True if uid has a live session for fingerprint (any session, when no fingerprint is sent)."""
+    key = _key(uid, fingerprint)
+    expires_at = _cache.get(key)
+    if expires_at is not None and expires_at > datetime.now(timezone.utc):
+        return True
+    with db_connect() as conn:
+        if fingerprint:
+            expires_at = conn.execute(queries.SESSION_GET, {"uid": uid, "fingerprint": fingerprint}).scalar()
+        else:
+            expires_at = conn.execute(queries.SESSION_GET_ANY, {"uid": uid}).scalar()
+    if expires_at is None:
+        _cache.pop(key, None)
+        return False
+    _cache[key] = expires_at
+    return True
+
+
+def delete_session(uid, fingerprint):
+    key = _key(uid, fingerprint)
+    _cache.pop(key, None)
+    with db_connect() as conn:
+        conn.execute(queries.SESSION_DELETE, {"uid": key[0], "fingerprint": key[1]})
+        conn.commit()
+
+
+def legacy_session_rejected(uid, fingerprint):
+    return _key(uid, fingerprint) in _rejected
+
+
+def migrate_legacy_session(uid, fingerprint, created_at, now=None):
+    """Move a Firestore login (created_at: its login times) into user_session.
+
+    The session keeps the expiry it had, SESSION_MAX_AGE after the newest login; if that has
+    passed, or there is no login time, nothing is saved and uid is turned away for a while.
+    """
+    now = now or datetime.now(timezone.utc)
+    logins = [t if t.tzinfo else t.replace(tzinfo=timezone.utc) for t in created_at if t is not None]
+    remaining = (max(logins) - now).total_seconds() + SESSION_MAX_AGE if logins else 0
+    if remaining <= 0:
+        _rejected[_key(uid, fingerprint)] = True
+        return False
+    save_session(uid, fingerprint, int(remaining))
+    return True
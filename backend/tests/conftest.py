@@ -0,0 +1,26 @@
+import json
+import os
+import sys
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+# the backend modules import each other by name, as they do when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# db.py builds its engine on import and needs a URL; nothing connects to it in the tests
+os.environ.setdefault("DATABASE_URL", "postgresql://test@localhost/test")
+
+# auth.py initialises firebase_admin on import; a throwaway service account is enough offline
+if not os.getenv("FIREBASE_CREDENTIALS"):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    os.environ["FIREBASE_CREDENTIALS"] = json.dumps({
+        "type": "service_account",
+        "project_id": "collabsphere-test",
+        "private_key_id": "test",
+        "private_key": key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                         serialization.NoEncryption()).decode(),
+        "client_email": "test@collabsphere-test.iam.gserviceaccount.com",
+        "client_id": "1",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    })
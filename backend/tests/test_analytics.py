@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+
+from sql import build_project_analytics
+
+
+def sprint_row(sprint_number, total, done, planned, completed):
+    return {"sprint_number": sprint_number, "total_tasks": total, "done_tasks": done,
+            "planned_points": planned, "completed_points": completed}
+
+
+PROJECT = {"start_date": date(2025, 1, 1), "end_date": date.today() + timedelta(days=10), "team_count": 3}
+SPRINTS = [
+    {"sprint_id": 1, "name": "Sprint 1", "start_date": date(2025, 1, 1), "end_date": date(2025, 1, 14)},
+    {"sprint_id": 2, "name": "Sprint 2", "start_date": date(2025, 1, 15), "end_date": date(2025, 1, 28)},
+]
+SPRINT_STATS = [
+    sprint_row(None, 2, 0, 3, 0),  # tasks without a sprint
+    sprint_row(1, 4, 4, 10, 10),
+    sprint_row(2, 4, 1, 12, 2),
+]
+PERFORMANCE = [
+    {"roll_no": "2021cs0001", "name": "Asha", "assigned_to": "2021cs0001", "done_tasks": 3, "total_tasks": 4},
+    {"roll_no": None, "name": None, "assigned_to": "outside-helper", "done_tasks": 0, "total_tasks": 0},
+]
+
+
+def test_summary_totals():
+    analytics = build_project_analytics(PROJECT, SPRINTS, SPRINT_STATS, PERFORMANCE)
+    assert analytics["summary"] == {"total_tasks": 10, "completed_tasks": 5, "total_points": 25,
+                                    "completed_points": 12, "team_size": 3}
+    assert analytics["percentage_completed"] == 50.0
+    assert analytics["team_efficiency"] == 0.5
+    assert analytics["pending_days"] == 10
+
+
+def test_velocity_is_the_latest_sprint():
+    analytics = build_project_analytics(PROJECT, SPRINTS, SPRINT_STATS, PERFORMANCE)
+    assert analytics["sprint_velocity"] == 2
+
+
+def test_tasks_without_a_sprint_fold_into_sprint_zero():
+    analytics = build_project_analytics(PROJECT, SPRINTS, SPRINT_STATS, PERFORMANCE)
+    assert analytics["burndown_data"] == [
+        {"sprint_number": 0, "planned_points": 3, "completed_points": 0},
+        {"sprint_number": 1, "planned_points": 10, "completed_points": 10},
+        {"sprint_number": 2, "planned_points": 12, "completed_points": 2},
+    ]
+    assert [v["velocity"] for v in analytics["velocity_trend"]] == [0, 10, 2]
+
+
+def test_team_performance_uses_names_and_handles_empty_members():
+    analytics = build_project_analytics(PROJECT, SPRINTS, SPRINT_STATS, PERFORMANCE)
+    assert analytics["team_performance"] == [
+        {"member": "Asha", "done_tasks": 3, "total_tasks": 4, "completion_rate": 75.0},
+        {"member": "outside-helper", "done_tasks": 0, "total_tasks": 0, "completion_rate": 0},
+    ]
+
+
+def test_empty_project():
+    project = {"start_date": None, "end_date": None, "team_count": None}
+    analytics = build_project_analytics(project, [], [], [])
+    assert analytics["percentage_completed"] == 0
+    assert analytics["sprint_velocity"] == 0
+    assert analytics["pending_days"] == 0
+    assert analytics["summary"]["team_size"] == 0
@@ -0,0 +1,131 @@
+import random
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import db
+import sql
+
+SCHEMA = [
+    'CREATE TABLE "Project" (project_id INTEGER PRIMARY KEY, start_date DATE, end_date DATE)',
+    "CREATE TABLE projectmembers (project_id INTEGER, member_id TEXT)",
+    'CREATE TABLE "User" (roll_no TEXT PRIMARY KEY, name TEXT)',
+    "CREATE TABLE sprint (sprint_id INTEGER, project_id INTEGER, name TEXT, start_date DATE, end_date DATE)",
+    """CREATE TABLE sprint_rollup (project_id INTEGER NOT NULL, sprint_number INTEGER NOT NULL,
+           total_tasks INTEGER NOT NULL DEFAULT 0, pending_tasks INTEGER NOT NULL DEFAULT 0,
+           review_tasks INTEGER NOT NULL DEFAULT 0, done_tasks INTEGER NOT NULL DEFAULT 0,
+           planned_points INTEGER NOT NULL DEFAULT 0, completed_points INTEGER NOT NULL DEFAULT 0,
+           PRIMARY KEY (project_id, sprint_number))""",
+    """CREATE TABLE assignee_rollup (project_id INTEGER NOT NULL, assigned_to TEXT NOT NULL,
+           total_tasks INTEGER NOT NULL DEFAULT 0, done_tasks INTEGER NOT NULL DEFAULT 0,
+           PRIMARY KEY (project_id, assigned_to))""",
+]
+
+MEMBERS = [f"2021cs{i:04d}" for i in range(8)]
+
+
+def baseline_analytics(tasks, sprints, team_count, names):
+    """get_project_analytics before the rollups: every figure computed from the raw task rows."""
+    total_tasks = len(tasks)
+    completed_tasks = [t for t in tasks if t["status"] == "done"]
+    sprint_numbers = [t["sprint_number"] for t in tasks if t["sprint_number"] is not None]
+    latest_sprint = max(sprint_numbers, default=None)
+    sprint_velocity = (
+        sum(t["points"] for t in tasks if t["sprint_number"] == latest_sprint and t["status"] == "done")
+        if latest_sprint is not None else 0
+    )
+    sprint_progress = {}
+    for t in tasks:
+        progress = sprint_progress.setdefault(t["sprint_number"] or 0, {"planned": 0, "completed": 0})
+        progress["planned"] += t["points"]
+        if t["status"] == "done":
+            progress["completed"] += t["points"]
+    performance = {}
+    for t in tasks:
+        counts = performance.setdefault(t["assigned_to"], [0, 0])
+        counts[0] += 1
+        counts[1] += t["status"] == "done"
+    return {
+        "project_start_date": None,
+        "project_end_date": None,
+        "sprints": sprints,
+        "percentage_completed": round(len(completed_tasks) / total_tasks * 100 if total_tasks else 0, 2),
+        "sprint_velocity": sprint_velocity,
+        "team_efficiency": round(len(completed_tasks) / total_tasks if total_tasks else 0, 2),
+        "pending_days": 0,
+        "burndown_data": [{"sprint_number": s, "planned_points": p["planned"], "completed_points": p["completed"]}
+                          for s, p in sorted(sprint_progress.items())],
+        "velocity_trend": [{"sprint_number": s, "velocity": p["completed"]} for s, p in sorted(sprint_progress.items())],
+        "team_performance": [{"member": names.get(assignee, assignee), "done_tasks": done, "total_tasks": total,
+                              "completion_rate": round(done / total * 100, 2)}
+                             for assignee, (total, done) in performance.items()],
+        "summary": {"total_tasks": total_tasks, "completed_tasks": len(completed_tasks),
+                    "total_points": sum(t["points"] for t in tasks),
+                    "completed_points": sum(t["points"] for t in completed_tasks), "team_size": team_count},
+    }
+
+
+def random_task(rng, project_id):
+    return {
+        "project_id": project_id,
+        "sprint_number": rng.choice([None, 1, 2, 3, 4]),
+        # members with and without a "User" row, and unassigned tasks
+        "assigned_to": rng.choice(MEMBERS + ["outside-helper", None]),
+        "points": rng.randint(0, 8),
+        "status": rng.choice(["pending", "review", "done"]),
+    }
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'analytics.db'}")
+    with engine.begin() as conn:
+        for statement in SCHEMA:
+            conn.execute(text(statement))
+    monkeypatch.setattr(db, "engine", engine)
+    return engine
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rollups_match_the_per_row_computation(engine, seed):
+    rng = random.Random(seed)
+    names = {roll_no: f"Member {i}" for i, roll_no in enumerate(MEMBERS[:6])}
+    tasks = {1: [], 2: []}
+    with engine.begin() as conn:
+        conn.execute(text('INSERT INTO "Project" VALUES (1, NULL, NULL), (2, NULL, NULL)'))
+        conn.execute(text('INSERT INTO "User" VALUES (:roll_no, :name)'),
+                     [{"roll_no": r, "name": n} for r, n in names.items()])
+        conn.execute(text("INSERT INTO projectmembers VALUES (1, 'a'), (1, 'b'), (1, 'c')"))
+        conn.execute(text("INSERT INTO sprint VALUES (1, 1, 'Sprint 1', '2025-01-01', '2025-01-14'), "
+                          "(2, 1, 'Sprint 2', '2025-01-15', '2025-01-28')"))
+
+        # the writes the task endpoints make: add, change (remove the old row, add the new) and delete
+        for _ in range(400):
+            project_id = rng.choice([1, 2])
+            rows = tasks[project_id]
+            action = rng.random()
+            if action < 0.6 or not rows:
+                task = random_task(rng, project_id)
+                rows.append(task)
+                sql.apply_task_rollup(conn, task, 1)
+            elif action < 0.85:
+                i = rng.randrange(len(rows))
+                changed = {**rows[i], **{k: v for k, v in random_task(rng, project_id).items()
+                                         if rng.random() < 0.5}}
+                sql.apply_task_rollup(conn, rows[i], -1)
+                sql.apply_task_rollup(conn, changed, 1)
+                rows[i] = changed
+            else:
+                sql.apply_task_rollup(conn, rows.pop(rng.randrange(len(rows))), -1)
+
+    sprints = [
+        {"sprint_id": 1, "name": "Sprint 1", "start_date": "2025-01-01", "end_date": "2025-01-14"},
+        {"sprint_id": 2, "name": "Sprint 2", "start_date": "2025-01-15", "end_date": "2025-01-28"},
+    ]
+    expected = baseline_analytics(tasks[1], sprints, 3, names)
+    actual = sql.get_project_analytics(1)
+    by_member = lambda row: str(row["member"])
+    expected["team_performance"].sort(key=by_member)
+    actual["team_performance"].sort(key=by_member)
+    actual["sprints"] = [dict(s) for s in actual["sprints"]]
+    assert actual == expected
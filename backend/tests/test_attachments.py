@@ -0,0 +1,131 @@
+import hashlib
+import io
+import os
+import threading
+import time
+
+import pytest
+
+import attachments
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    store = attachments.LocalStore(str(tmp_path))
+    monkeypatch.setattr(attachments, "store", store)
+    return store
+
+
+class SlowStream(io.BytesIO):
+    """Request body that waits before its first chunk, so two uploads overlap."""
+
+    def __init__(self, data, delay):
+        super().__init__(data)
+        self.delay = delay
+
+    def read(self, size=-1):
+        if self.delay:
+            time.sleep(self.delay)
+            self.delay = 0
+        return super().read(size)
+
+
+def start(data, owner="u1"):
+    return attachments.start_upload({"file_name": "notes.txt", "size": len(data), "content_type": "text/plain"},
+                                    owner)
+
+
+def test_chunked_upload_completes_with_its_sha256(store):
+    data = b"a" * 100 + b"b" * 50
+    upload = start(data)
+    assert attachments.append_chunk(upload["upload_id"], 0, io.BytesIO(data[:100]))["offset"] == 100
+    assert attachments.upload_status(upload["upload_id"])["offset"] == 100
+    done = attachments.append_chunk(upload["upload_id"], 100, io.BytesIO(data[100:]))
+    assert done["complete"] and done["attachment_id"] == hashlib.sha256(data).hexdigest()
+    with open(store.blob_path(done["attachment_id"]), "rb") as f:
+        assert f.read() == data
+
+
+def test_wrong_offset_reports_the_current_one():
+    upload = start(b"x" * 10)
+    attachments.append_chunk(upload["upload_id"], 0, io.BytesIO(b"x" * 4))
+    with pytest.raises(attachments.UploadError) as e:
+        attachments.append_chunk(upload["upload_id"], 0, io.BytesIO(b"x" * 4))
+    assert e.value.status == 409 and e.value.offset == 4
+
+
+def test_oversized_chunk_is_rolled_back():
+    upload = start(b"x" * 10)
+    with pytest.raises(attachments.UploadError) as e:
+        attachments.append_chunk(upload["upload_id"], 0, io.BytesIO(b"x" * 11))
+    assert e.value.status == 413
+    assert attachments.upload_status(upload["upload_id"])["offset"] == 0
+
+
+def test_concurrent_appends_at_the_same_offset(store):
+    data = bytes(range(256)) * 4
+    upload = start(data)
+    results = []
+
+    def send(body, delay):
+        try:
+            results.append(attachments.append_chunk(upload["upload_id"], 0, SlowStream(body, delay)))
+        except attachments.UploadError as e:
+            results.append(e.status)
+
+    threads = [threading.Thread(target=send, args=(data, 0.2)),
+               threading.Thread(target=send, args=(data[::-1], 0))]
+    threads[0].start()
+    time.sleep(0.05)
+    threads[1].start()
+    for t in threads:
+        t.join()
+
+    done = [r for r in results if isinstance(r, dict)]
+    assert len(done) == 1 and 409 in results
+    assert done[0]["attachment_id"] == hashlib.sha256(data).hexdigest()
+
+
+def test_cancelled_upload_is_gone():
+    upload = start(b"x" * 10)
+    attachments.cancel_upload(upload["upload_id"])
+    with pytest.raises(attachments.UploadError) as e:
+        attachments.append_chunk(upload["upload_id"], 0, io.BytesIO(b"x"))
+    assert e.value.status == 404
+
+
+def test_uploads_belong_to_their_owner():
+    upload = start(b"x" * 10, owner="u1")
+    with pytest.raises(attachments.UploadError) as e:
+        attachments.append_chunk(upload["upload_id"], 0, io.BytesIO(b"x"), owner="u2")
+    assert e.value.status == 404
+    with pytest.raises(attachments.UploadError):
+        attachments.cancel_upload(upload["upload_id"], owner="u2")
+    assert attachments.upload_status(upload["upload_id"], owner="u1")["offset"] == 0
+
+
+def test_open_uploads_are_limited_per_user(monkeypatch):
+    monkeypatch.setattr(attachments, "MAX_OPEN_UPLOADS", 2)
+    first = start(b"x" * 10)
+    start(b"x" * 10)
+    with pytest.raises(attachments.UploadError) as e:
+        start(b"x" * 10)
+    assert e.value.status == 429
+    start(b"x" * 10, owner="u2")  # other users are not affected
+
+    attachments.cancel_upload(first["upload_id"], owner="u1")
+    start(b"x" * 10)
+
+
+def test_idle_uploads_are_swept():
+    idle = start(b"x" * 10)
+    busy = start(b"x" * 10)
+    attachments.append_chunk(busy["upload_id"], 0, io.BytesIO(b"x" * 4))
+    part_path, _ = attachments.store.upload_paths(idle["upload_id"])
+    old = time.time() - attachments.UPLOAD_TTL_SECONDS - 10
+    os.utime(part_path, (old, old))
+
+    assert attachments.sweep_uploads() == 1
+    with pytest.raises(attachments.UploadError):
+        attachments.upload_status(idle["upload_id"])
+    assert attachments.upload_status(busy["upload_id"])["offset"] == 4
@@ -0,0 +1,58 @@
+import time
+
+import jwt
+from flask import Flask, jsonify, request
+
+import auth
+import session_tokens
+
+
+def make_app():
+    app = Flask(__name__)
+
+    @app.route("/protected")
+    @auth.firebase_uid_required
+    def protected():
+        return jsonify(request.user)
+
+    return app
+
+
+def foreign_token(uid="u1"):
+    """A token another worker signed with its own per-process key."""
+    now = int(time.time())
+    claims = {"sub": uid, "roll_no": "2021cs0001", "role": None, "iat": now, "exp": now + 60, "jti": "x"}
+    return jwt.encode(claims, "another worker's secret", algorithm="HS256",
+                      headers={"kid": session_tokens.ACTIVE_KID})
+
+
+def test_session_token_is_accepted():
+    client = make_app().test_client()
+    client.set_cookie(session_tokens.COOKIE_NAME, session_tokens.issue("u1", "2021cs0001"))
+    response = client.get("/protected")
+    assert response.status_code == 200
+    assert response.json["roll_no"] == "2021cs0001"
+
+
+def test_foreign_token_falls_back_to_uid_cookie(monkeypatch):
+    monkeypatch.setattr(auth, "verified_session", lambda uid, fingerprint: {"uid": uid})
+    client = make_app().test_client()
+    client.set_cookie(session_tokens.COOKIE_NAME, foreign_token())
+    client.set_cookie("uid", "u1")
+    response = client.get("/protected")
+    assert response.status_code == 200
+    assert response.json == {"uid": "u1"}
+
+
+def test_foreign_token_without_uid_cookie_is_rejected():
+    client = make_app().test_client()
+    client.set_cookie(session_tokens.COOKIE_NAME, foreign_token())
+    assert client.get("/protected").status_code == 401
+
+
+def test_expired_token_is_rejected(monkeypatch):
+    monkeypatch.setattr(auth, "verified_session", lambda uid, fingerprint: {"uid": uid})
+    client = make_app().test_client()
+    client.set_cookie(session_tokens.COOKIE_NAME, session_tokens.issue("u1", "2021cs0001", max_age=-10))
+    client.set_cookie("uid", "u1")
+    assert client.get("/protected").status_code == 401
@@ -0,0 +1,122 @@
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+import db
+import sql
+
+
+def test_pool_counts_checkouts_and_timeouts():
+    engine = create_engine("sqlite://", poolclass=db.MeteredQueuePool, pool_size=1, max_overflow=0,
+                           pool_timeout=0.05)
+    before = db.pool_metrics.snapshot(engine.pool)
+
+    held = engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    held.close()
+    with engine.connect():
+        pass
+
+    after = db.pool_metrics.snapshot(engine.pool)
+    assert after["checkouts"] - before["checkouts"] == 2
+    assert after["checkout_timeouts"] - before["checkout_timeouts"] == 1
+    assert after["checkout_wait_max_ms"] >= 50
+    assert after["pool_size"] == 1 and after["in_use"] == 0
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE note (body TEXT)"))
+    monkeypatch.setattr(db, "engine", engine)
+
+    app = Flask(__name__)
+    db.init_app(app)
+    app.ran = []
+
+    @app.route("/write/<int:status>")
+    def write(status):
+        # two helpers, each "committing", share the request's transaction
+        with db.db_connect() as conn:
+            conn.execute(text("INSERT INTO note VALUES ('first')"))
+            conn.commit()
+        with db.db_begin() as conn:
+            conn.execute(text("INSERT INTO note VALUES ('second')"))
+        db.after_commit(lambda: app.ran.append(status))
+        return "", status
+
+    return app
+
+
+def notes(app):
+    with db.engine.connect() as conn:
+        return [row[0] for row in conn.execute(text("SELECT body FROM note"))]
+
+
+def test_request_commits_once_on_success(app):
+    assert app.test_client().get("/write/200").status_code == 200
+    assert notes(app) == ["first", "second"]
+    assert app.ran == [200]
+
+
+def test_request_rolls_back_on_error_status(app):
+    assert app.test_client().get("/write/500").status_code == 500
+    assert notes(app) == []
+    assert app.ran == []
+
+
+def test_after_commit_outside_a_request_runs_now():
+    ran = []
+    db.after_commit(lambda: ran.append(True))
+    assert ran == [True]
+
+
+@pytest.fixture
+def sql_app(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sql.db'}", poolclass=db.MeteredQueuePool,
+                           pool_size=2, max_overflow=0)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE "User" (roll_no TEXT PRIMARY KEY, role_type TEXT)'))
+        conn.execute(text("CREATE TABLE projectmembers (project_id INTEGER, member_id TEXT, role TEXT)"))
+        conn.execute(text("""CREATE TABLE task (id INTEGER PRIMARY KEY, project_id INTEGER, sprint_number INTEGER,
+                                 description TEXT, assigned_to TEXT, status TEXT, points INTEGER)"""))
+        conn.execute(text("""CREATE TABLE sprint_rollup (project_id INTEGER, sprint_number INTEGER,
+                                 total_tasks INTEGER, pending_tasks INTEGER, review_tasks INTEGER, done_tasks INTEGER,
+                                 planned_points INTEGER, completed_points INTEGER,
+                                 PRIMARY KEY (project_id, sprint_number))"""))
+        conn.execute(text("""CREATE TABLE assignee_rollup (project_id INTEGER, assigned_to TEXT, total_tasks INTEGER,
+                                 done_tasks INTEGER, PRIMARY KEY (project_id, assigned_to))"""))
+        conn.execute(text("""INSERT INTO "User" VALUES ('u1', 'student')"""))
+        conn.execute(text("INSERT INTO projectmembers VALUES (1, 'u1', 'admin')"))
+    monkeypatch.setattr(db, "engine", engine)
+    engine.transactions = []
+    event.listen(engine, "commit", lambda conn: engine.transactions.append("commit"))
+    event.listen(engine, "rollback", lambda conn: engine.transactions.append("rollback"))
+
+    app = Flask(__name__)
+    db.init_app(app)
+
+    @app.route("/task/<int:status>")
+    def add_tasks(status):
+        # what a task view does: a few reads, then writes through helpers that each commit
+        assert sql.user_role("u1") == "student"
+        assert sql.is_valid_member(1, "u1")
+        assert sql.add_task(1, 1, "first", "u1", 3, "pending")[0]
+        assert sql.add_task(1, None, "second", None, 2, "pending")[0]
+        return "", status
+
+    return app
+
+
+@pytest.mark.parametrize("status, outcome, tasks", [(200, ["commit"], 2), (500, ["rollback"], 0)])
+def test_request_of_sql_helpers_uses_one_checkout_and_one_transaction(sql_app, status, outcome, tasks):
+    before = db.pool_metrics.snapshot(db.engine.pool)["checkouts"]
+    assert sql_app.test_client().get(f"/task/{status}").status_code == status
+    assert db.pool_metrics.snapshot(db.engine.pool)["checkouts"] - before == 1
+    assert db.engine.transactions == outcome
+    with db.engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM task")).scalar() == tasks
+        assert conn.execute(text("SELECT COUNT(*) FROM sprint_rollup")).scalar() == tasks
@@ -0,0 +1,62 @@
+import pytest
+from flask import Flask, jsonify
+
+import http_cache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(http_cache, "counters", http_cache.Counters(*http_cache.counters.snapshot()))
+    monkeypatch.setattr(http_cache, "project_etag", lambda project_id, daily=False: f"p{project_id}v1")
+    app = Flask(__name__)
+    http_cache.init_app(app)
+    app.views = 0
+
+    @app.route("/project/view_details")
+    @http_cache.project_conditional()
+    def details():
+        app.views += 1
+        return jsonify({"description": "x" * 2000})
+
+    @app.route("/best_projects")
+    def best():
+        response = jsonify({"projects": []})
+        response.add_etag()
+        return response
+
+    client = app.test_client()
+    client.app = app
+    return client
+
+
+def test_early_304_skips_the_view(client):
+    response = client.get("/project/view_details?project_id=1", headers={"If-None-Match": '"p1v1"'})
+    assert response.status_code == 304 and client.app.views == 0
+    stats = http_cache.stats()
+    assert stats["conditional"] == 1 and stats["not_modified"] == 1 and stats["not_modified_early"] == 1
+
+
+def test_compressed_etag_matches_on_the_way_back(client):
+    first = client.get("/project/view_details?project_id=1", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert first.headers["ETag"] == '"p1v1-gzip"'
+    again = client.get("/project/view_details?project_id=1",
+                       headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_hit_rate_only_counts_conditional_requests(client):
+    for _ in range(3):
+        client.get("/project/view_details?project_id=1")
+    client.get("/project/view_details?project_id=1", headers={"If-None-Match": '"p1v1"'})
+    client.get("/project/view_details?project_id=1", headers={"If-None-Match": '"stale"'})
+    stats = http_cache.stats()
+    assert stats["conditional"] == 2 and stats["not_modified"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_body_etag_is_answered_after_the_view(client):
+    etag = client.get("/best_projects").headers["ETag"]
+    response = client.get("/best_projects", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert http_cache.stats()["conditional"] == 1
@@ -0,0 +1,78 @@
+import datetime
+import threading
+import time
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+import id_tokens
+
+
+def certificate_pem():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(1).not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256()))
+    return cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class FakeResponse:
+    def __init__(self, certs, max_age):
+        self.certs = certs
+        self.headers = {"Cache-Control": f"public, max-age={max_age}"}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.certs
+
+
+def fake_google(monkeypatch, certs, max_age=3600, delay=0.0):
+    fetches = []
+
+    def get(url, timeout):
+        fetches.append(url)
+        time.sleep(delay)
+        return FakeResponse(certs, max_age)
+
+    monkeypatch.setattr(id_tokens.requests, "get", get)
+    return fetches
+
+
+def test_cold_start_fetches_once(monkeypatch):
+    fetches = fake_google(monkeypatch, {"k1": certificate_pem()}, delay=0.1)
+    keys = id_tokens.SigningKeys(url="certs")
+    found = []
+    threads = [threading.Thread(target=lambda: found.append(keys.get("k1"))) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(fetches) == 1
+    assert all(key is not None for key in found)
+
+
+def test_keys_are_cached_for_max_age(monkeypatch):
+    fetches = fake_google(monkeypatch, {"k1": certificate_pem()}, max_age=3600)
+    keys = id_tokens.SigningKeys(url="certs")
+    keys.get("k1")
+    keys.get("k1")
+    assert len(fetches) == 1
+    assert keys._expires_at - keys._fetched_at == 3600
+
+
+def test_unknown_kid_refetches_at_most_every_min_refetch(monkeypatch):
+    fetches = fake_google(monkeypatch, {"k1": certificate_pem()})
+    keys = id_tokens.SigningKeys(url="certs", min_refetch=30)
+    assert keys.get("k1") is not None
+    assert keys.get("rotated") is None
+    assert len(fetches) == 1
+
+    keys._fetched_at -= 31
+    assert keys.get("rotated") is None
+    assert len(fetches) == 2
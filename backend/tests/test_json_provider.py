@@ -0,0 +1,40 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Flask, jsonify, request
+from sqlalchemy import create_engine, text
+
+from json_provider import OrjsonProvider
+
+
+def make_app():
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    return app
+
+
+def test_dates_and_decimals():
+    with make_app().app_context():
+        body = jsonify({"day": date(2025, 1, 31), "at": datetime(2025, 1, 31, 9, 30),
+                        "points": Decimal("12"), "average": Decimal("3.5")}).get_json()
+    assert body == {"day": "2025-01-31", "at": "2025-01-31T09:30:00", "points": 12, "average": 3.5}
+
+
+def test_rows_and_mappings():
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT 1 AS sprint_id, 'Sprint 1' AS name")).fetchone()
+        mapping = conn.execute(text("SELECT 2 AS sprint_id, 'Sprint 2' AS name")).mappings().fetchone()
+    with make_app().app_context():
+        body = jsonify([row, mapping]).get_json()
+    assert body == [{"sprint_id": 1, "name": "Sprint 1"}, {"sprint_id": 2, "name": "Sprint 2"}]
+
+
+def test_request_bodies_are_parsed():
+    app = make_app()
+
+    @app.route("/echo", methods=["POST"])
+    def echo():
+        return jsonify(request.get_json())
+
+    assert app.test_client().post("/echo", json={"ids": [1, 2]}).get_json() == {"ids": [1, 2]}
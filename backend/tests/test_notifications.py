@@ -0,0 +1,73 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+import queries
+import sql
+
+Row = namedtuple("Row", "id kind payload created_at read_at settled_before")
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.params = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params):
+        if statement is queries.NOTIFICATION_UNREAD:
+            return FakeResult([], 0)
+        self.statement, self.params = statement, params
+        return FakeResult(self.rows[:params["limit"]])
+
+
+class FakeResult:
+    def __init__(self, rows, value=None):
+        self.rows = rows
+        self.value = value
+
+    def fetchall(self):
+        return self.rows
+
+    def scalar(self):
+        return self.value
+
+
+@pytest.fixture
+def inbox(monkeypatch):
+    conn = FakeConnection([])
+    monkeypatch.setattr(sql, "db_connect", lambda: conn)
+    with Flask(__name__).app_context():
+        yield conn
+
+
+def row(id, age, now=datetime(2025, 1, 1, 12, 0)):
+    return Row(id, "invite", {}, now - timedelta(seconds=age), None,
+               now - timedelta(seconds=sql.NOTIFICATION_SINCE_OVERLAP))
+
+
+def test_unpaged_call_is_the_first_page_of_unread(inbox):
+    sql.notification_sql({"user_id": "u1"})
+    assert inbox.statement is queries.NOTIFICATION_PAGE
+    assert inbox.params["unread_only"] is True
+    assert inbox.params["limit"] == sql.NOTIFICATION_PAGE_SIZE + 1
+
+
+def test_since_holds_back_for_late_commits(inbox):
+    inbox.rows = [row(1, 120), row(2, 5)]
+    body, _ = sql.notification_sql({"user_id": "u1", "since": sql.encode_cursor({"at": "2025-01-01T11:00:00", "id": 0})})
+    # row 2 is recent: the next call starts at settled_before and sees it again
+    assert sql.decode_cursor(body.get_json()["since"]) == {"at": "2025-01-01T11:59:30", "id": 0}
+
+
+def test_since_advances_past_settled_rows(inbox):
+    inbox.rows = [row(1, 300), row(2, 120)]
+    body, _ = sql.notification_sql({"user_id": "u1", "since": sql.encode_cursor({"at": "2025-01-01T11:00:00", "id": 0})})
+    assert sql.decode_cursor(body.get_json()["since"]) == {"at": "2025-01-01T11:58:00", "id": 2}
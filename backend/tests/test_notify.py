@@ -0,0 +1,18 @@
+import notify
+
+
+def test_publish_reaches_client_manager(monkeypatch):
+    emitter = notify.make_emitter("redis://localhost:6379/0")
+    sent = []
+    monkeypatch.setattr(emitter.server.manager, "emit",
+                        lambda event, data, namespace=None, room=None, **kwargs: sent.append((event, data, room)))
+    monkeypatch.setattr(notify, "_emitter", emitter)
+
+    notify.publish("u1", {"kind": "project_application"})
+
+    assert sent == [("notification", {"kind": "project_application"}, "user:u1")]
+
+
+def test_publish_without_queue_is_a_no_op(monkeypatch):
+    monkeypatch.setattr(notify, "_emitter", None)
+    notify.publish("u1", {"kind": "project_application"})
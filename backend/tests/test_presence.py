@@ -0,0 +1,86 @@
+import time
+
+import pytest
+import socketio
+
+import notify
+import presence
+
+# in requirements-dev.txt
+pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def client():
+    client = presence.redis_client("fakeredis://")
+    client.flushall()
+    return client
+
+
+def test_count_is_summed_across_workers(client):
+    a, b = presence.RedisPresence(client), presence.RedisPresence(client)
+    a.connected()
+    a.connected()
+    b.connected()
+    assert a.count() == b.count() == 3
+
+    a.disconnected()
+    assert b.count() == 2
+
+
+def test_dead_worker_stops_counting_when_its_key_expires(client):
+    a, b = presence.RedisPresence(client), presence.RedisPresence(client)
+    a.connected()
+    b.connected()
+    client.delete(b.key)  # b missed its heartbeats and the TTL ran out
+    assert a.count() == 1
+    assert client.smembers(presence.WORKERS_KEY) == {a.worker_id.encode()}
+
+    b.heartbeat()
+    assert a.count() == 2
+
+
+def test_keys_carry_the_ttl(client):
+    a = presence.RedisPresence(client, ttl=30)
+    a.connected()
+    assert 0 < client.ttl(a.key) <= 30
+
+
+def worker(room):
+    """A chat worker on the fakeredis queue with one client in room; records what it sends."""
+    server = socketio.Server(async_mode="threading", client_manager=presence.make_client_manager("fakeredis://"))
+    server.received = []
+    server._send_eio_packet = lambda eio_sid, pkt: server.received.append(pkt.data)
+    server.manager_initialized = True
+    server.manager.initialize()
+    server.manager.enter_room(server.manager.connect("eio", "/"), "/", room)
+    return server
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.mark.parametrize("workers", [2, 4, 8])
+def test_notifications_fan_out_to_every_worker(workers):
+    room = notify.user_room(f"u{workers}")
+    servers = [worker(room) for _ in range(workers)]
+    emitter = notify.make_emitter("fakeredis://")
+
+    for i in range(200):
+        emitter.emit("notification", {"i": i}, to=room)
+
+    assert wait_for(lambda: all(len(s.received) == 200 for s in servers))
+    for server in servers:
+        assert server.received[0] == '2["notification",{"i":0}]'
+        assert server.received[-1] == '2["notification",{"i":199}]'
+
+
+def test_room_emit_from_one_worker_reaches_the_others():
+    a, b = worker("general:fanout"), worker("general:fanout")
+    a.emit("messages", {"message": "hi"}, to="general:fanout")
+    assert wait_for(lambda: len(a.received) == len(b.received) == 1)
+    assert b.received == ['2["messages",{"message":"hi"}]']
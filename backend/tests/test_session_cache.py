@@ -0,0 +1,106 @@
+import pytest
+from firebase_admin import auth as firebase_auth
+
+import auth
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeShared:
+    """The bits of a redis client SessionCache uses; expiry is not modelled."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+class FakeUser:
+    def __init__(self, uid):
+        self.uid = uid
+        self.email = f"{uid}@iiitkottayam.ac.in"
+        self.display_name = uid.title()
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def lookups(monkeypatch, clock):
+    """Stub Firebase: "ghost" is not a user, anything else is. Returns the uids looked up."""
+    calls = []
+
+    def get_user(uid):
+        calls.append(uid)
+        if uid == "ghost":
+            raise firebase_auth.UserNotFoundError("No user record found")
+        return FakeUser(uid)
+
+    monkeypatch.setattr(auth.auth, "get_user", get_user)
+    monkeypatch.setattr(auth, "session_cache", auth.SessionCache(ttl=300, negative_ttl=60, maxsize=100, timer=clock))
+    return calls
+
+
+def test_valid_session_is_cached_until_ttl(lookups, clock):
+    assert auth.verified_session("asha", "fp")["email"] == "asha@iiitkottayam.ac.in"
+    clock.now = 299
+    assert auth.verified_session("asha", "fp")["uid"] == "asha"
+    assert lookups == ["asha"]
+
+    clock.now = 301
+    auth.verified_session("asha", "fp")
+    assert lookups == ["asha", "asha"]
+
+
+def test_fingerprint_is_part_of_the_key(lookups):
+    auth.verified_session("asha", "laptop")
+    auth.verified_session("asha", "phone")
+    assert lookups == ["asha", "asha"]
+
+
+def test_unknown_uid_is_negatively_cached_for_less_time(lookups, clock):
+    assert auth.verified_session("ghost", "fp") is None
+    clock.now = 59
+    assert auth.verified_session("ghost", "fp") is None
+    assert lookups == ["ghost"]
+
+    clock.now = 61
+    assert auth.verified_session("ghost", "fp") is None
+    assert lookups == ["ghost", "ghost"]
+    stats = auth.session_cache.stats()
+    assert stats["negative_hits"] == 1 and stats["negative_size"] == 1
+
+
+def test_invalidate_forces_a_lookup(lookups):
+    auth.verified_session("asha", "fp")
+    auth.session_cache.invalidate(auth.session_key("asha", "fp"))
+    auth.verified_session("asha", "fp")
+    assert lookups == ["asha", "asha"]
+
+
+def test_shared_cache_serves_other_workers(clock):
+    shared = FakeShared()
+    first = auth.SessionCache(ttl=300, negative_ttl=60, maxsize=100, shared=shared, timer=clock)
+    second = auth.SessionCache(ttl=300, negative_ttl=60, maxsize=100, shared=shared, timer=clock)
+    first.set(("asha", "fp"), {"uid": "asha"})
+    first.set(("ghost", "fp"), None)
+
+    assert second.get(("asha", "fp")) == (True, {"uid": "asha"})
+    assert second.get(("ghost", "fp")) == (True, None)
+    assert second.get(("nobody", "fp")) == (False, None)
+    assert second.stats()["shared_hits"] == 2
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import queries
+import sessions
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class FakeConnection:
+    """Answers session queries from a dict of (uid, fingerprint) -> expires_at."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def commit(self):
+        pass
+
+    def execute(self, statement, params):
+        self.statements.append(statement)
+        key = (params["uid"], params.get("fingerprint"))
+        if statement is queries.SESSION_GET:
+            value = self.rows.get(key)
+        elif statement is queries.SESSION_GET_ANY:
+            value = max((v for (uid, _), v in self.rows.items() if uid == params["uid"]), default=None)
+        elif statement is queries.SESSION_UPSERT:
+            value = self.rows[key] = datetime.now(timezone.utc) + timedelta(seconds=params["max_age"])
+        elif statement is queries.SESSION_DELETE:
+            value = self.rows.pop(key, None)
+        return FakeResult(value)
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    conn = FakeConnection({})
+    monkeypatch.setattr(sessions, "db_connect", lambda: conn)
+    sessions._cache.clear()
+    sessions._rejected.clear()
+    return conn
+
+
+def later(**kwargs):
+    return datetime.now(timezone.utc) + timedelta(**kwargs)
+
+
+def test_point_read_by_uid_and_fingerprint(conn):
+    conn.rows[("u1", "laptop")] = later(days=1)
+    assert sessions.session_valid("u1", "laptop")
+    assert not sessions.session_valid("u1", "phone")
+    assert conn.statements == [queries.SESSION_GET, queries.SESSION_GET]
+
+
+def test_live_session_is_cached(conn):
+    conn.rows[("u1", "laptop")] = later(days=1)
+    assert sessions.session_valid("u1", "laptop")
+    assert sessions.session_valid("u1", "laptop")
+    assert len(conn.statements) == 1
+
+
+def test_misses_are_not_cached(conn):
+    assert not sessions.session_valid("u1", "laptop")
+    # the login may have happened on another worker since
+    conn.rows[("u1", "laptop")] = later(days=1)
+    assert sessions.session_valid("u1", "laptop")
+
+
+def test_expired_cache_entry_goes_back_to_the_database(conn):
+    sessions._cache[("u1", "laptop")] = later(seconds=-1)
+    assert not sessions.session_valid("u1", "laptop")
+    assert conn.statements == [queries.SESSION_GET]
+
+
+def test_no_fingerprint_accepts_any_session(conn):
+    conn.rows[("u1", "laptop")] = later(days=1)
+    assert sessions.session_valid("u1", None)
+    assert conn.statements == [queries.SESSION_GET_ANY]
+
+
+def test_save_then_delete(conn):
+    sessions.save_session("u1", "laptop")
+    assert sessions.session_valid("u1", "laptop")
+    assert conn.statements == [queries.SESSION_UPSERT]
+
+    sessions.delete_session("u1", "laptop")
+    assert not sessions.session_valid("u1", "laptop")
+
+
+def test_legacy_login_keeps_its_expiry(conn):
+    now = datetime.now(timezone.utc)
+    logged_in = now - timedelta(days=1)
+    assert sessions.migrate_legacy_session("u1", "laptop", [logged_in.replace(tzinfo=None)], now)
+    expires_at = conn.rows[("u1", "laptop")]
+    assert abs((expires_at - (logged_in + timedelta(seconds=sessions.SESSION_MAX_AGE))).total_seconds()) < 5
+
+
+def test_expired_legacy_login_is_not_migrated(conn):
+    old = datetime.now(timezone.utc) - timedelta(seconds=sessions.SESSION_MAX_AGE + 1)
+    assert not sessions.migrate_legacy_session("u1", "laptop", [old, None])
+    assert not sessions.migrate_legacy_session("u2", "laptop", [])
+    assert conn.statements == []
+    # turned away for a while, until the user logs in again
+    assert sessions.legacy_session_rejected("u1", "laptop")
+    sessions.save_session("u1", "laptop")
+    assert not sessions.legacy_session_rejected("u1", "laptop")
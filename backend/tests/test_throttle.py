@@ -0,0 +1,80 @@
+import pytest
+
+from throttle import RateLimiter, TokenBucket, TypingCoalescer
+
+
+def test_bucket_allows_a_burst_then_the_rate():
+    bucket = TokenBucket(rate=2, burst=3, now=0)
+    assert [bucket.allow(0) for _ in range(4)] == [True, True, True, False]
+    assert not bucket.allow(0.4)  # 0.8 tokens
+    assert bucket.allow(0.5)
+    assert not bucket.allow(0.5)
+
+
+def test_bucket_saves_up_no_more_than_burst():
+    bucket = TokenBucket(rate=2, burst=3, now=0)
+    assert sum(bucket.allow(100) for _ in range(10)) == 3
+
+
+def test_bucket_ignores_a_clock_going_backwards():
+    bucket = TokenBucket(rate=1, burst=1, now=10)
+    assert bucket.allow(10)
+    assert not bucket.allow(5)
+    assert not bucket.allow(10.5)
+    assert bucket.allow(11)
+
+
+def test_limiter_keeps_a_bucket_per_connection():
+    limiter = RateLimiter(rate=1, burst=2)
+    assert [limiter.allow("a", now=0) for _ in range(3)] == [True, True, False]
+    assert limiter.allow("b", now=0)
+    assert limiter.allow("a", now=1)
+
+
+def test_forgotten_connection_starts_with_a_full_bucket():
+    limiter = RateLimiter(rate=1, burst=2)
+    limiter.allow("a", now=0)
+    limiter.allow("a", now=0)
+    limiter.forget("a")
+    assert [limiter.allow("a", now=0) for _ in range(3)] == [True, True, False]
+
+
+@pytest.fixture
+def typing():
+    return TypingCoalescer(window=1, expiry=5)
+
+
+def test_first_change_goes_out_and_repeats_are_coalesced(typing):
+    assert typing.update("general", "u1", True, now=0) is True
+    assert typing.update("general", "u1", True, now=0.2) is None
+    assert typing.update("general", "u1", True, now=3) is None
+
+
+def test_change_inside_the_window_is_held_for_sweep(typing):
+    typing.update("general", "u1", True, now=0)
+    assert typing.update("general", "u1", False, now=0.5) is None
+    assert typing.sweep(now=0.9) == []
+    assert typing.sweep(now=1.0) == [("general", "u1", False)]
+    assert typing.sweep(now=1.1) == []
+
+
+def test_flicker_inside_the_window_sends_nothing(typing):
+    typing.update("general", "u1", True, now=0)
+    typing.update("general", "u1", False, now=0.3)
+    typing.update("general", "u1", True, now=0.6)
+    assert typing.sweep(now=2) == []
+
+
+def test_quiet_typist_is_stopped_after_expiry_then_dropped(typing):
+    typing.update("general", "u1", True, now=0)
+    assert typing.sweep(now=5) == []
+    assert typing.sweep(now=5.1) == [("general", "u1", False)]
+    assert len(typing._state) == 1
+    typing.sweep(now=10.2)
+    assert typing._state == {}
+
+
+def test_rooms_and_users_are_separate(typing):
+    assert typing.update("general", "u1", True, now=0) is True
+    assert typing.update("general", "u2", True, now=0) is True
+    assert typing.update("project:1", "u1", True, now=0) is True
@@ -0,0 +1,120 @@
+# throttle.py
+# Inbound event limits for the chat server (sender.py): a token bucket per connection, and
+# coalescing of typing indicators so a room sees state changes rather than every keystroke.
+import threading
+import time
+
+
+class Counters:
+    def __init__(self, *names):
+        self._lock = threading.Lock()
+        self._values = dict.fromkeys(names, 0)
+
+    def add(self, name, n=1):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + n
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+
+counters = Counters("events", "dropped", "typing_coalesced", "typing_emitted", "typing_expired")
+
+
+class TokenBucket:
+    """rate tokens per second, up to burst saved up."""
+
+    def __init__(self, rate, burst, now=None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic() if now is None else now
+
+    def allow(self, now=None):
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + max(now - self.updated, 0) * self.rate)
+        # an earlier now must not move the refill point back and credit the same time twice
+        self.updated = max(self.updated, now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class RateLimiter:
+    """One TokenBucket per connection id."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, sid, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(sid)
+            if bucket is None:
+                bucket = self._buckets[sid] = TokenBucket(self.rate, self.burst, now)
+            allowed = bucket.allow(now)
+        counters.add("events")
+        if not allowed:
+            counters.add("dropped")
+        return allowed
+
+    def forget(self, sid):
+        with self._lock:
+            self._buckets.pop(sid, None)
+
+
+class TypingCoalescer:
+    """Typing state per (room, user), emitting at most one transition per window.
+
+    A user who stops sending typing events is marked stopped after expiry seconds, and their
+    entry is dropped once it has been stopped for another expiry.
+    """
+
+    def __init__(self, window, expiry):
+        self.window = window
+        self.expiry = expiry
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def update(self, room, user, typing, now=None):
+        """Record an event; returns the state to emit now, or None if it was coalesced."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            st = self._state.get((room, user))
+            if st is None:
+                st = self._state[(room, user)] = {"typing": False, "wanted": False,
+                                                  "emitted_at": now - self.window, "seen_at": now}
+            st["wanted"] = typing
+            if typing:
+                st["seen_at"] = now
+            if st["wanted"] == st["typing"] or now - st["emitted_at"] < self.window:
+                # same state, or too soon after the last change; sweep() sends any pending change
+                counters.add("typing_coalesced")
+                return None
+            st["typing"] = typing
+            st["emitted_at"] = now
+        counters.add("typing_emitted")
+        return typing
+
+    def sweep(self, now=None):
+        """Expire stale indicators and release held-back changes; returns [(room, user, typing)]."""
+        now = time.monotonic() if now is None else now
+        changes = []
+        with self._lock:
+            for key, st in list(self._state.items()):
+                if st["wanted"] and now - st["seen_at"] > self.expiry:
+                    st["wanted"] = False
+                    counters.add("typing_expired")
+                if st["wanted"] != st["typing"] and now - st["emitted_at"] >= self.window:
+                    st["typing"] = st["wanted"]
+                    st["emitted_at"] = now
+                    changes.append((key[0], key[1], st["typing"]))
+                elif not st["typing"] and not st["wanted"] and now - st["emitted_at"] > self.expiry:
+                    del self._state[key]
+        counters.add("typing_emitted", len(changes))
+        return changes
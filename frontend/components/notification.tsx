@@ -1,6 +1,6 @@
 "use client"
 
-import { useState, useEffect } from "react"
+import { useState, useEffect, useRef } from "react"
 import { Bell, Check, X } from "lucide-react"
 import { Button } from "@/components/ui/button"
 import { 
@@ -15,6 +15,10 @@ import { useUserContext } from "@/lib/usercontext"
 import Link from "next/link";
 
 interface Notification {
+  notification_id: number
+  kind: string
+  created_at: string
+  read: boolean
   application_id: number
   applied: "user" | "admin"
   applied_at: string
@@ -32,11 +36,23 @@ export default function NotificationBell() {
   const [error, setError] = useState<string | null>(null)
   const [open, setOpen] = useState(false)
   const { user } = useUserContext()
+  // "since" from the last response; polls after the first only ask for what is new
+  const since = useRef<string | null>(null)
   
   // Use user ID from context, or fall back to a dummy ID for development
   const userId = user?.id || 'sanjay23bcy51'
 
-  const fetchNotifications = async () => {
+  // Merge newer rows into the list by notification_id; the server repeats the last half
+  // minute's rows on purpose, so duplicates are expected
+  const mergeNotifications = (prev: Notification[], incoming: Notification[]) => {
+    const byId = new Map(prev.map(n => [n.notification_id, n]))
+    incoming.forEach(n => byId.set(n.notification_id, n))
+    return Array.from(byId.values()).sort((a, b) => b.created_at.localeCompare(a.created_at))
+  }
+
+  // The backend also pushes a Socket.IO "notification" event, but nothing in the frontend
+  // listens for it yet, so this still polls; with since, an idle poll returns nothing.
+  const fetchNotifications = async (full = false) => {
     try {
       setLoading(true)
       setError(null)
@@ -59,9 +75,10 @@ export default function NotificationBell() {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({
-          user_id: userId,
-        }),
+        // the server takes the user from the session cookie
+        body: JSON.stringify(
+          full || !since.current ? {} : { since: since.current }
+        ),
       })
 
       if (!response.ok) {
@@ -72,7 +89,9 @@ export default function NotificationBell() {
       console.log("Notifications:", data)
       
       if (data.notification && Array.isArray(data.notification)) {
-        setNotifications(data.notification)
+        const incremental = !full && since.current
+        setNotifications(prev => incremental ? mergeNotifications(prev, data.notification) : data.notification)
+        if (data.since) since.current = data.since
       } else {
         // If the data structure isn't as expected, log and initialize with empty array
         console.warn("Unexpected data structure:", data)
@@ -95,6 +114,10 @@ export default function NotificationBell() {
         console.log("Using mock notification data for development")
         setNotifications([
           {
+            notification_id: 1,
+            kind: "application",
+            created_at: "2025-04-02T18:17:00.583870",
+            read: false,
             application_id: 13,
             applied: "user",
             applied_at: "2025-04-02T18:17:00.583870",
@@ -114,7 +137,8 @@ export default function NotificationBell() {
   }
 
   useEffect(() => {
-    fetchNotifications()
+    since.current = null
+    fetchNotifications(true)
 
     // Set up polling for notifications every minute instead of 30 seconds
     // This reduces server load while still providing reasonably fresh data
@@ -165,7 +189,7 @@ export default function NotificationBell() {
       alert("Failed to process the request. Please try again.")
       
       // Refresh notifications to get current state
-      fetchNotifications()
+      fetchNotifications(true)
     } finally {
       setLoading(false)
     }
@@ -174,7 +198,11 @@ export default function NotificationBell() {
   const pendingNotifications = notifications.filter(n => n.status === "Pending")
 
   return (
-    <Popover open={open} onOpenChange={setOpen}>
+    <Popover open={open} onOpenChange={(isOpen) => {
+      setOpen(isOpen)
+      // since only brings new rows; a full read picks up applications decided elsewhere
+      if (isOpen) fetchNotifications(true)
+    }}>
       <PopoverTrigger asChild>
         <Button variant="ghost" size="icon" className="relative">
           <Bell className="h-5 w-5" />
@@ -206,7 +234,7 @@ export default function NotificationBell() {
               size="sm" 
               variant="outline" 
               className="text-xs"
-              onClick={fetchNotifications}
+              onClick={() => fetchNotifications(true)}
             >
               Retry
             </Button>
@@ -220,7 +248,7 @@ export default function NotificationBell() {
             <div className="divide-y divide-zinc-800">
               {notifications.map((notification) => (
                 <div 
-                  key={notification.application_id} 
+                  key={notification.notification_id} 
                   className={`p-4 hover:bg-zinc-900 transition-colors ${
                     notification.status === "Pending" ? "bg-zinc-900/50" : ""
                   }`}